@@ -0,0 +1,400 @@
+import hashlib
+import json
+import logging
+import shutil
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Annotated
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from orion.config.settings import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest updates are only locked within the process
+    fcntl = None  # type: ignore[assignment]
+
+app = typer.Typer(no_args_is_help=True, help="Manage artifacts in ORION_HOME_DIR.")
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+# files which SQLite keeps next to a database in WAL or rollback journal mode
+SQLITE_SIDECARS = ("-wal", "-shm", "-journal")
+_LOCK = threading.Lock()
+
+
+@dataclass
+class Artifact:
+    """
+    An entry of the artifact manifest.
+    """
+
+    path: str
+    size: int
+    producer: str
+    derivable: bool = True
+    sha256: str | None = None
+    created: float = 0.0
+    last_access: float = 0.0
+
+
+def _path_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def _file_sha256(path: Path) -> str | None:
+    if not path.is_file():
+        return None
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def _parse_size(size: str) -> int:
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    size = size.strip().upper().removesuffix("B")
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+class ArtifactStore:
+    """
+    A manifest of the artifacts (downloaded archives, extracted datasets, exported
+    datasets, model weights, ...) stored in ORION_HOME_DIR, with their size, hash,
+    producer and last access time. Artifacts which can be derived again (e.g.
+    downloaded again) are evicted in least recently used order when the store
+    exceeds its quota.
+    """
+
+    def __init__(self, home: Path | None = None, quota: int | None = None):
+        """
+        Open the artifact store.
+
+        Args:
+            home (Path | None, optional): the store's root directory.
+                Defaults to settings.ORION_HOME_DIR.
+            quota (int | None, optional): maximum size of the store, in bytes.
+                Defaults to settings.ORION_HOME_QUOTA.
+        """
+        self.home = (home or settings.ORION_HOME_DIR).resolve()
+        self.quota = quota if quota is not None else settings.ORION_HOME_QUOTA
+        self.manifest = self.home / MANIFEST_FILE
+
+    @classmethod
+    def of(cls, path: Path) -> "ArtifactStore":
+        """
+        Return the store which tracks a path: the store rooted at the nearest parent
+        directory of path which holds a store's manifest, or the default store.
+
+        Args:
+            path (Path): the artifact's file or directory.
+
+        Returns:
+            ArtifactStore: the store.
+        """
+        for parent in path.resolve().parents:
+            if (parent / f"{MANIFEST_FILE}.lock").is_file():
+                return cls(parent)
+        return cls()
+
+    def create(self):
+        """
+        Create the store's manifest if it does not exist, so that artifacts created
+        in its root directory are registered in this store rather than in the
+        default store.
+        """
+        with self._entries():
+            pass
+
+    @contextmanager
+    def _entries(self) -> Iterator[dict[str, Artifact]]:
+        """
+        Lock the manifest and yield its entries, which are saved on exit.
+        """
+        self.home.mkdir(parents=True, exist_ok=True)
+        with _LOCK, open(self.home / f"{MANIFEST_FILE}.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = {}
+            if self.manifest.is_file():
+                with open(self.manifest) as f:
+                    entries = {entry["path"]: Artifact(**entry) for entry in json.load(f)}
+            yield entries
+            tmp = self.manifest.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump([asdict(entry) for entry in entries.values()], f, indent=1)
+            tmp.replace(self.manifest)
+
+    def _key(self, path: Path) -> str | None:
+        try:
+            return str(path.resolve().relative_to(self.home))
+        except ValueError:
+            return None
+
+    def register(
+        self, path: Path, producer: str, derivable: bool = True, hash: bool = True
+    ) -> Artifact | None:
+        """
+        Register (or update) an artifact in the manifest. Paths outside of the
+        store's root directory are ignored.
+
+        Args:
+            path (Path): the artifact's file or directory.
+            producer (str): the name of the function or module which created it.
+            derivable (bool, optional): whether the artifact can be derived again
+                and thus evicted. Defaults to True.
+            hash (bool, optional): compute the sha256 of file artifacts.
+                Defaults to True.
+
+        Returns:
+            Artifact | None: the artifact, or None if path is outside the store.
+        """
+        key = self._key(path)
+        if key is None or not path.exists():
+            return None
+
+        now = time.time()
+        artifact = Artifact(
+            path=key,
+            size=_path_size(path),
+            producer=producer,
+            derivable=derivable,
+            sha256=_file_sha256(path) if hash else None,
+            created=now,
+            last_access=now,
+        )
+        with self._entries() as entries:
+            if key in entries:
+                artifact.created = entries[key].created
+            entries[key] = artifact
+        return artifact
+
+    def touch(self, path: Path):
+        """
+        Update an artifact's last access time.
+
+        Args:
+            path (Path): the artifact's file or directory.
+        """
+        key = self._key(path)
+        if key is None:
+            return
+        with self._entries() as entries:
+            if key in entries:
+                entries[key].last_access = time.time()
+
+    def remove(self, path: Path):
+        """
+        Delete an artifact from disk and from the manifest.
+
+        Args:
+            path (Path): the artifact's file or directory.
+        """
+        key = self._key(path)
+        if key is None:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+            return
+        with self._entries() as entries:
+            self._delete(entries, key)
+
+    def _delete(self, entries: dict[str, Artifact], key: str):
+        path = self.home / key
+        size = entries[key].size if key in entries else 0
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink(missing_ok=True)
+            for suffix in SQLITE_SIDECARS:
+                path.with_name(f"{path.name}{suffix}").unlink(missing_ok=True)
+        # directories holding the deleted artifact shrink by its size
+        for parent in (str(parent) for parent in Path(key).parents):
+            if parent in entries:
+                entries[parent].size = max(entries[parent].size - size, 0)
+        # entries nested in a deleted directory are deleted as well
+        for nested in [k for k in entries if k == key or k.startswith(f"{key}/")]:
+            del entries[nested]
+
+    def artifacts(self) -> list[Artifact]:
+        """
+        Return the artifacts in the manifest, dropping the ones which no longer exist
+        on disk.
+
+        Returns:
+            list[Artifact]: the artifacts, in least recently used order.
+        """
+        with self._entries() as entries:
+            for key in [k for k in entries if not (self.home / k).exists()]:
+                del entries[key]
+            return sorted(entries.values(), key=lambda a: a.last_access)
+
+    @staticmethod
+    def total_size(artifacts: list[Artifact]) -> int:
+        """
+        Return the total size of artifacts, not counting artifacts nested in other
+        artifacts twice.
+
+        Args:
+            artifacts (list[Artifact]): the artifacts.
+
+        Returns:
+            int: the total size, in bytes.
+        """
+        paths = {a.path for a in artifacts}
+        return sum(
+            a.size
+            for a in artifacts
+            if not any(str(parent) in paths for parent in Path(a.path).parents)
+        )
+
+    def prune(
+        self, quota: int | None = None, all: bool = False, dry_run: bool = False
+    ) -> list[Artifact]:
+        """
+        Evict derivable artifacts until the store's total size fits in its quota.
+        Files (e.g. downloaded archives) are evicted before directories (e.g.
+        extracted datasets), even when nested in one, and each in least recently
+        used order.
+
+        Args:
+            quota (int | None, optional): the quota, in bytes. Defaults to the
+                store's quota.
+            all (bool, optional): evict all derivable artifacts. Defaults to False.
+            dry_run (bool, optional): only return the artifacts which would be
+                evicted. Defaults to False.
+
+        Returns:
+            list[Artifact]: the evicted artifacts.
+        """
+        quota = quota if quota is not None else self.quota
+        if quota is None and not all:
+            return []
+
+        artifacts = self.artifacts()
+        size = self.total_size(artifacts)
+        sizes = {a.path: a.size for a in artifacts}
+        evicted: list[Artifact] = []
+        candidates = sorted(
+            (a for a in artifacts if a.derivable),
+            key=lambda a: ((self.home / a.path).is_dir(), a.last_access),
+        )
+        for artifact in candidates:
+            if not all and size <= (quota or 0):
+                break
+            # artifacts nested in an evicted directory are already evicted with it
+            parents = [str(parent) for parent in Path(artifact.path).parents]
+            if any(a.path in parents for a in evicted):
+                continue
+            evicted.append(artifact)
+            freed = sizes[artifact.path]
+            size -= freed
+            for parent in parents:
+                if parent in sizes:
+                    sizes[parent] -= freed
+
+        if not dry_run and evicted:
+            with self._entries() as entries:
+                for artifact in evicted:
+                    self._delete(entries, artifact.path)
+            LOGGER.info(
+                f"Evicted {len(evicted)} artifacts "
+                f"({_format_size(sum(a.size for a in evicted))})."
+            )
+        return evicted
+
+
+def register_artifact(
+    path: Path, producer: str, derivable: bool = True, hash: bool = True
+) -> Artifact | None:
+    """
+    Register an artifact in the store which tracks its path (see
+    `ArtifactStore.of`), ORION_HOME_DIR by default.
+
+    Args:
+        path (Path): the artifact's file or directory.
+        producer (str): the name of the function or module which created it.
+        derivable (bool, optional): whether the artifact can be derived again and
+            thus evicted. Defaults to True.
+        hash (bool, optional): compute the sha256 of file artifacts.
+            Defaults to True.
+
+    Returns:
+        Artifact | None: the artifact, or None if path is outside the store.
+    """
+    return ArtifactStore.of(path).register(path, producer, derivable, hash)
+
+
+@app.command()
+def ls(
+    home: Annotated[
+        Path,
+        typer.Option("--dir", "-d", help="Orion home directory.", file_okay=False),
+    ] = settings.ORION_HOME_DIR,
+):
+    """
+    List the artifacts in Orion's home directory.
+    """
+    store = ArtifactStore(home)
+    artifacts = store.artifacts()
+    table = Table("path", "size", "producer", "derivable", "last access")
+    for artifact in reversed(artifacts):
+        table.add_row(
+            artifact.path,
+            _format_size(artifact.size),
+            artifact.producer,
+            "yes" if artifact.derivable else "no",
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(artifact.last_access)),
+        )
+    console = Console()
+    console.print(table)
+    quota = "" if store.quota is None else f" / {_format_size(store.quota)}"
+    console.print(f"Total: {_format_size(store.total_size(artifacts))}{quota}")
+
+
+@app.command()
+def prune(
+    home: Annotated[
+        Path,
+        typer.Option("--dir", "-d", help="Orion home directory.", file_okay=False),
+    ] = settings.ORION_HOME_DIR,
+    quota: Annotated[
+        str | None,
+        typer.Option("--quota", "-q", help="size quota (e.g. 50G)."),
+    ] = None,
+    all: Annotated[
+        bool, typer.Option("--all", help="evict all derivable artifacts.")
+    ] = False,
+    dry_run: Annotated[
+        bool, typer.Option("--dry-run", help="only list artifacts to evict.")
+    ] = False,
+):
+    """
+    Evict derivable artifacts in least recently used order until Orion's home
+    directory fits in its quota.
+    """
+    store = ArtifactStore(home)
+    evicted = store.prune(_parse_size(quota) if quota is not None else None, all, dry_run)
+    verb = "Would evict" if dry_run else "Evicted"
+    for artifact in evicted:
+        LOGGER.info(f"{verb} {artifact.path} ({_format_size(artifact.size)})")
+    if not evicted:
+        LOGGER.info("Nothing to evict.")
@@ -3,6 +3,7 @@ import logging
 import typer
 from rich.logging import RichHandler
 
+from orion.artifacts import app as cache_app
 from orion.datasets.prepare import app as prepare_app
 from orion.yolo.yolo import app as yolo_app
 
@@ -15,6 +16,7 @@ app = typer.Typer(no_args_is_help=True)
 
 app.add_typer(prepare_app)
 app.add_typer(yolo_app)
+app.add_typer(cache_app, name="cache")
 
 if __name__ == "__main__":
     app()
@@ -9,6 +9,8 @@ class Settings(BaseSettings):
     )
 
     ORION_HOME_DIR: Path = Path.home() / ".cache" / "orion"
+    ORION_DETECTION_CACHE_SIZE: int = 512 * 1024 * 1024
+    ORION_HOME_QUOTA: int | None = None
 
 
 settings = Settings()
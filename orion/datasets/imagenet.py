@@ -1,9 +1,17 @@
 import logging
 import re
 import shutil
+import sqlite3
 import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
+import requests
+
+from orion.artifacts import ArtifactStore, register_artifact
 from orion.config.settings import settings
 from orion.utils import download_file
 
@@ -11,43 +19,212 @@ LOGGER = logging.getLogger(__name__)
 
 CLASS_ID_FILE = "imagenet21k_wordnet_ids.txt"
 CLASS_NAME_FILE = "imagenet21k_wordnet_lemmas.txt"
+HIERARCHY_FILE = "wordnet.is_a.txt"
+CLASS_INDEX_FILE = "imagenet21k_index.sqlite"
 
+CLASS_ID_URL = "https://storage.googleapis.com/bit_models/imagenet21k_wordnet_ids.txt"
+CLASS_NAME_URL = (
+    "https://storage.googleapis.com/bit_models/imagenet21k_wordnet_lemmas.txt"
+)
+HIERARCHY_URL = "https://image-net.org/archive/wordnet.is_a.txt"
 
-def get_class_names(dir: Path) -> dict[str, str]:
+# keywords made only of these characters are searched as token prefixes in the
+# full-text index, other keywords are treated as regular expressions.
+PLAIN_KEYWORD = re.compile(r"[\w\s-]+")
+
+
+def build_class_index(dir: Path) -> Path:
     """
-    Download class ids and names for ImageNet (if not already present in directory)
-    and return a dict of class id to class name.
+    Download class ids, names and the WordNet hierarchy for ImageNet (if not already
+    present in directory) and build a SQLite full-text index of the classes.
 
     Args:
         dir (Path): dataset directory
 
     Returns:
-        dict[str, str]: dict of class id to class name
+        Path: the index file
     """
-    id_file = dir / CLASS_ID_FILE
-    name_file = dir / CLASS_NAME_FILE
+    dir.mkdir(parents=True, exist_ok=True)
+    id_file = download_file(CLASS_ID_URL, dir / CLASS_ID_FILE)
+    name_file = download_file(CLASS_NAME_URL, dir / CLASS_NAME_FILE)
+    try:
+        hierarchy_file: Path | None = download_file(HIERARCHY_URL, dir / HIERARCHY_FILE)
+    except requests.RequestException as e:
+        LOGGER.warning(f"Unable to download WordNet hierarchy ({e}). Skipping.")
+        hierarchy_file = None
 
-    download_file(
-        "https://storage.googleapis.com/bit_models/imagenet21k_wordnet_ids.txt", id_file
+    with open(id_file, "r") as f:
+        ids = [line.strip() for line in f]
+    with open(name_file, "r") as f:
+        names = [line.strip() for line in f]
+
+    edges = []
+    if hierarchy_file is not None:
+        with open(hierarchy_file, "r") as f:
+            edges = [tuple(line.split()) for line in f if line.strip()]
+
+    index_file = dir / CLASS_INDEX_FILE
+    tmp_file = index_file.with_suffix(".tmp")
+    tmp_file.unlink(missing_ok=True)
+    with sqlite3.connect(tmp_file) as conn:
+        conn.executescript("""
+            CREATE TABLE classes (id TEXT PRIMARY KEY, lemmas TEXT NOT NULL);
+            CREATE VIRTUAL TABLE classes_fts USING fts5(
+                lemmas, content='classes', prefix='2 3'
+            );
+            CREATE TABLE hierarchy (parent TEXT NOT NULL, child TEXT NOT NULL);
+            CREATE INDEX hierarchy_parent ON hierarchy (parent);
+            """)
+        conn.executemany("INSERT INTO classes VALUES (?, ?)", zip(ids, names))
+        conn.execute(
+            "INSERT INTO classes_fts (rowid, lemmas) SELECT rowid, lemmas FROM classes"
+        )
+        conn.executemany("INSERT INTO hierarchy VALUES (?, ?)", edges)
+    conn.close()
+    tmp_file.replace(index_file)
+    register_artifact(index_file, producer="imagenet", hash=False)
+
+    LOGGER.info(f"Built ImageNet class index {index_file} ({len(ids)} classes).")
+    return index_file
+
+
+@lru_cache
+def open_class_index(dir: Path) -> sqlite3.Connection:
+    """
+    Open the ImageNet class index in dir, building it first if it does not exist.
+
+    Args:
+        dir (Path): dataset directory
+
+    Returns:
+        sqlite3.Connection: a read-only connection to the index
+    """
+    index_file = dir / CLASS_INDEX_FILE
+    if not index_file.is_file():
+        build_class_index(dir)
+
+    conn = sqlite3.connect(
+        f"file:{index_file}?mode=ro", uri=True, check_same_thread=False
     )
-    download_file(
-        "https://storage.googleapis.com/bit_models/imagenet21k_wordnet_lemmas.txt",
-        name_file,
+    conn.create_function(
+        "regexp",
+        2,
+        lambda pattern, value: re.search(pattern, value, re.IGNORECASE) is not None,
+        deterministic=True,
     )
+    return conn
 
-    with open(id_file, "r") as f:
-        ids = f.readlines()
 
-    with open(name_file, "r") as f:
-        names = f.readlines()
+def get_class_names(dir: Path) -> dict[str, str]:
+    """
+    Return a dict of ImageNet class id to class name, read from the class index in
+    dir (which is built if not already present in directory).
+
+    Args:
+        dir (Path): dataset directory
+
+    Returns:
+        dict[str, str]: dict of class id to class name
+    """
+    conn = open_class_index(dir)
+    return dict(conn.execute("SELECT id, lemmas FROM classes ORDER BY rowid"))
+
+
+def get_class_children(
+    class_id: str, dir: Path, recursive: bool = True
+) -> dict[str, str]:
+    """
+    Return the hyponyms (children) of an ImageNet class in the WordNet hierarchy.
+
+    Args:
+        class_id (str): the class id
+        dir (Path): dataset directory
+        recursive (bool, optional): return all descendants instead of the direct
+            children only. Defaults to True.
+
+    Returns:
+        dict[str, str]: dict of class id to class name for the children
+    """
+    conn = open_class_index(dir)
+    if recursive:
+        query = """
+            WITH RECURSIVE descendants (id) AS (
+                SELECT child FROM hierarchy WHERE parent = :id
+                UNION
+                SELECT child FROM hierarchy JOIN descendants ON parent = descendants.id
+            )
+            SELECT classes.id, lemmas FROM descendants JOIN classes USING (id)
+            ORDER BY classes.rowid
+        """
+    else:
+        query = """
+            SELECT classes.id, lemmas FROM hierarchy JOIN classes ON classes.id = child
+            WHERE parent = :id ORDER BY classes.rowid
+        """
+    return dict(conn.execute(query, {"id": class_id}))
+
+
+def _search_keyword(conn: sqlite3.Connection, keyword: str) -> dict[str, str]:
+    """
+    Search the class index for a single keyword. Plain keywords are matched as
+    token prefixes against the full-text index, other keywords are matched as
+    regular expressions.
+
+    Args:
+        conn (sqlite3.Connection): connection to the class index
+        keyword (str): the keyword
+
+    Returns:
+        dict[str, str]: dict of class id to class name for matching classes
+    """
+    if PLAIN_KEYWORD.fullmatch(keyword):
+        tokens = re.findall(r"\w+", keyword)
+        if not tokens:
+            return {}
+        match = " ".join(f'"{token}"*' for token in tokens)
+        rows = conn.execute(
+            "SELECT id, classes.lemmas FROM classes_fts "
+            "JOIN classes ON classes.rowid = classes_fts.rowid "
+            "WHERE classes_fts MATCH ? ORDER BY classes.rowid",
+            (match,),
+        )
+    else:
+        rows = conn.execute(
+            "SELECT id, lemmas FROM classes WHERE lemmas REGEXP ? ORDER BY rowid",
+            (keyword,),
+        )
+    return dict(rows)
+
+
+@dataclass
+class ClassReport:
+    """
+    Summary of the images and labels extracted for an ImageNet class.
+    """
+
+    class_id: str
+    images: int = 0
+    labels: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    skipped: bool = False
 
-    classes = {ids[i].strip(): names[i].strip() for i in range(len(ids))}
-    return classes
+    def __str__(self) -> str:
+        if self.skipped:
+            return f"{self.class_id}: already downloaded, skipped."
+        mb = self.bytes / 1e6
+        return (
+            f"{self.class_id}: {self.images} images, {self.labels} labels, "
+            f"{mb:.1f} MB in {self.seconds:.1f}s "
+            f"({mb / max(self.seconds, 1e-9):.1f} MB/s)."
+        )
 
 
 def download_annotations(class_ids: list[str], dir: Path) -> list[str]:
     """
-    Download ImageNet annotations for given class ids, into dir.
+    Download and extract the ImageNet annotations archive into dir, and return the
+    class ids which have annotations. The per-class annotation archives are left in
+    the `bboxes_annotations` directory for `extract_class`.
 
     Args:
         class_ids (list[str]): the class ids
@@ -66,62 +243,123 @@ def download_annotations(class_ids: list[str], dir: Path) -> list[str]:
     # Extract annotations
     with tarfile.open(annotations_file, "r:gz") as tf:
         tf.extractall(annotations_dir)
+    register_artifact(annotations_dir, producer="imagenet", hash=False)
 
-    # Extract annotations for each class
     annoted_classes = []
     for class_id in class_ids:
-        class_label_dir = dir / "labels" / class_id
-        if class_label_dir.exists():
-            LOGGER.info(
-                f"Annotations directory {class_label_dir} already exists. "
-                "Skipping extract."
-            )
+        if (annotations_dir / f"{class_id}.tar.gz").exists():
+            annoted_classes.append(class_id)
         else:
-            annotations_class_file = annotations_dir / f"{class_id}.tar.gz"
-            if annotations_class_file.exists():
-                with tarfile.open(annotations_class_file, "r:gz") as tf:
-                    tf.extractall(annotations_dir)
-                shutil.move(annotations_dir / "Annotation" / class_id, class_label_dir)
-                LOGGER.info(f"Extracted annotations for {class_id} to {class_label_dir}")
-                annoted_classes.append(class_id)
-            else:
-                LOGGER.info(f"There are no annotations for class {class_id}.")
-
-    # Delete annotations directory
-    LOGGER.info("Deleting annotations dir.")
-    shutil.rmtree(annotations_dir)
+            LOGGER.info(f"There are no annotations for class {class_id}.")
     return annoted_classes
 
 
-def download_imagenet_detections(class_ids: list[str], dir: Path):
+def extract_class(class_id: str, dir: Path) -> ClassReport:
     """
-    Download ImageNet images and annotations for given class ids into dir
+    Download and extract the images of an ImageNet class, then extract its
+    annotations, keeping only the labels which have a matching image.
+
+    Args:
+        class_id (str): the class id
+        dir (Path): the dataset directory
+
+    Returns:
+        ClassReport: the extraction report for the class
+    """
+    class_dir = dir / "data" / class_id
+    class_label_dir = dir / "labels" / class_id
+    if class_dir.exists() and class_label_dir.exists():
+        return ClassReport(class_id, skipped=True)
+
+    start = time.perf_counter()
+    report = ClassReport(class_id)
+
+    # Download synset images
+    if class_dir.exists():
+        LOGGER.info(f"Directory {class_dir} already exists. Skipping download.")
+        images = {path.stem for path in class_dir.iterdir() if not path.is_dir()}
+    else:
+        tarfilename = dir / f"{class_id}.tar"
+        url = f"https://image-net.org/data/winter21_whole/{class_id}.tar"
+        download_file(url, tarfilename, hash=False)
+        report.bytes += tarfilename.stat().st_size
+        with tarfile.open(tarfilename) as tf:
+            members = [member for member in tf.getmembers() if member.isfile()]
+            tf.extractall(class_dir, members=members)
+        images = {Path(member.name).stem for member in members}
+        # the synset archive is not needed anymore once extracted
+        ArtifactStore.of(tarfilename).remove(tarfilename)
+    report.images = len(images)
+
+    # Extract only the annotations with a matching image
+    annotations_class_file = dir / "bboxes_annotations" / f"{class_id}.tar.gz"
+    report.bytes += annotations_class_file.stat().st_size
+    class_label_dir.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(annotations_class_file, "r:gz") as tf:
+        for member in tf:
+            name = Path(member.name)
+            if not member.isfile() or name.stem not in images:
+                continue
+            source = tf.extractfile(member)
+            if source is None:
+                continue
+            with source, open(class_label_dir / name.name, "wb") as dest:
+                shutil.copyfileobj(source, dest)
+            report.labels += 1
+
+    register_artifact(class_dir, producer="imagenet", hash=False)
+    register_artifact(class_label_dir, producer="imagenet", hash=False)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def download_imagenet_detections(
+    class_ids: list[str], dir: Path, workers: int = 4
+) -> list[ClassReport]:
+    """
+    Download ImageNet images and annotations for given class ids into dir. Classes
+    are downloaded and extracted in parallel by a pool of workers.
 
     Args:
         class_ids (list[str]): class_ids to download
         dir (Path): the directory to save images into
+        workers (int, optional): number of classes processed in parallel.
+            Defaults to 4.
+
+    Returns:
+        list[ClassReport]: the extraction report of each class
     """
     # Create dataset_dir
     dir.mkdir(exist_ok=True)
-    data_dir = dir / "data"
-    data_dir.mkdir(exist_ok=True)
-    labels_dir = dir / "labels"
-    labels_dir.mkdir(exist_ok=True)
+    (dir / "data").mkdir(exist_ok=True)
+    (dir / "labels").mkdir(exist_ok=True)
 
     annoted_classes = download_annotations(class_ids, dir)
 
-    # Download synset images for each class with annotations
-    for class_id in annoted_classes:
-        class_dir = data_dir / class_id
-        if class_dir.exists():
-            LOGGER.info(f"Directory {class_dir} already exists. Skipping download.")
-        else:
-            tarfilename = dir / f"{class_id}.tar"
-            url = f"https://image-net.org/data/winter21_whole/{class_id}.tar"
-            download_file(url, tarfilename)
-            with tarfile.open(tarfilename) as tf:
-                tf.extractall(class_dir)
-            LOGGER.info(f"Extracted {class_dir}.")
+    # Download synset images and annotations for each class with annotations
+    start = time.perf_counter()
+    reports = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(extract_class, class_id, dir): class_id
+            for class_id in annoted_classes
+        }
+        for future in as_completed(futures):
+            report = future.result()
+            LOGGER.info(str(report))
+            reports.append(report)
+    elapsed = time.perf_counter() - start
+
+    # Delete annotations directory
+    LOGGER.info("Deleting annotations dir.")
+    shutil.rmtree(dir / "bboxes_annotations")
+
+    images = sum(report.images for report in reports)
+    LOGGER.info(
+        f"Extracted {images} images for {len(reports)} classes in {elapsed:.1f}s "
+        f"({images / max(elapsed, 1e-9):.1f} images/s)."
+    )
+    return reports
 
 
 def cleanup_labels_without_images(dir: Path):
@@ -150,36 +388,50 @@ def cleanup_labels_without_images(dir: Path):
 def search(
     keywords: list[str],
     dir: Path = settings.ORION_HOME_DIR / "imagenet",
-):
+    children: bool = False,
+) -> dict[str, str]:
     """
     Search image net classes matching the given keywords.
 
     Args:
-        keywords (list[str]): List of keywords to search for.
+        keywords (list[str]): List of keywords to search for. Plain words are
+            matched as token prefixes, other keywords as regular expressions.
         dir (Path, optional): directory where files will be downloaded.
             Defaults to ORION_HOME_DIR / "imagenet".
+        children (bool, optional): expand matching classes with their children in
+            the WordNet hierarchy. Defaults to False.
+
+    Returns:
+        dict[str, str]: dict of class id to class name for matching classes
     """
-    classes = get_class_names(dir)
-    filtered = {
-        id: lemma
-        for id, lemma in classes.items()
-        if any([re.search(query, lemma, re.IGNORECASE) for query in keywords])
-    }
+    conn = open_class_index(dir)
+    filtered: dict[str, str] = {}
+    for keyword in keywords:
+        filtered.update(_search_keyword(conn, keyword))
+
+    if children:
+        for id in list(filtered):
+            filtered.update(get_class_children(id, dir))
+
     LOGGER.info(f"Displaying all ImageNet classes containing one of {keywords}")
     LOGGER.info("\n".join([f"{id}: \t{name}" for id, name in filtered.items()]))
+    return filtered
 
 
 def download(
     ids: list[str],
     dir: Path = settings.ORION_HOME_DIR / "imagenet",
+    workers: int = 4,
 ):
     """
-    Download ImageNet images and annotations for the given class ids.
+    Download ImageNet images and annotations for the given class ids. Labels
+    without a matching image are never extracted.
 
     Args:
         ids (list[str]): the class ids to download.
         dir (Path, optional): the dataset directory.
             Defaults to settings.ORION_HOME_DIR / "imagenet".
+        workers (int, optional): number of classes downloaded in parallel.
+            Defaults to 4.
     """
-    download_imagenet_detections(ids, dir)
-    cleanup_labels_without_images(dir)
+    download_imagenet_detections(ids, dir, workers)
@@ -8,6 +8,7 @@ import fiftyone.zoo as foz
 import typer
 from fiftyone.types.dataset_types import VOCDetectionDataset, YOLOv4Dataset
 
+from orion.artifacts import ArtifactStore
 from orion.config.settings import settings
 from orion.datasets.imagenet import download as download_imagenet
 from orion.datasets.roboflow import LABEL_MAPPING
@@ -44,6 +45,10 @@ def prepare(
         dir (Path, optional): directory where files will be downloaded.
             Defaults to ORION_HOME_DIR.
     """
+    # track the artifacts created in dir in its own store
+    store = ArtifactStore(dir)
+    store.create()
+
     LOGGER.info("========== Downloading images from ImageNet dataset ==========")
     # Download ImageNet images for classes imagenet_ids
     imagenet_dir = dir / "imagenet"
@@ -109,3 +114,9 @@ def prepare(
         split=["train", "val", "test"],
         overwrite=True,
     )
+    # the export is not derivable (random_split draws new splits on every run), so
+    # prune never evicts it
+    store.register(export_dir, producer="prepare", derivable=False, hash=False)
+
+    # evict least recently used downloads if dir exceeds its quota
+    store.prune()
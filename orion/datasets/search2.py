@@ -1,10 +1,12 @@
 import csv
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import cv2
 import fiftyone as fo
 import numpy as np
+from PIL import Image
 
 from orion.config.settings import settings
 from orion.utils import download_and_extract
@@ -32,66 +34,109 @@ def download(dir: Path = settings.ORION_HOME_DIR / "search_2"):
     download_and_extract(DATASET_URL, "search_2.tar.gz", dir)
 
 
+def _read_image_size(filepath: Path) -> tuple[int, int]:
+    """
+    Read an image's width and height from its header, without decoding it.
+
+    Args:
+        filepath (Path): the image file
+
+    Returns:
+        tuple[int, int]: the image's width and height
+    """
+    with Image.open(filepath) as img:
+        return img.size
+
+
+def _load_mask(maskfp: Path, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+    """
+    Decode a mask and only keep its values inside the given bounding box.
+
+    Args:
+        maskfp (Path): the mask file
+        x0 (int): left coordinate of the bounding box, in pixels
+        y0 (int): top coordinate of the bounding box, in pixels
+        x1 (int): right coordinate of the bounding box, in pixels
+        y1 (int): bottom coordinate of the bounding box, in pixels
+
+    Returns:
+        np.ndarray: the cropped mask
+    """
+    mask = cv2.imread(str(maskfp), cv2.IMREAD_GRAYSCALE)
+    return mask[y0:y1, x0:x1]
+
+
 def load_search_2_dataset(
     dir: Path = settings.ORION_HOME_DIR / "search_2" / "search_2",
+    workers: int | None = None,
+    chunk_size: int = 256,
 ) -> fo.Dataset:
     """
-    Load The Seach_2 dataset from disk into a fiftyone Dataset
+    Load The Seach_2 dataset from disk into a fiftyone Dataset. Masks are decoded
+    and cropped by a pool of processes, and samples are added to the dataset in
+    chunks to keep memory bounded.
 
     Args:
         dir (Path, optional): dataset directory. Defaults to
             settings.ORION_HOME_DIR / "search_2" / "search_2"
+        workers (int | None, optional): number of processes used to decode masks.
+            Defaults to None (number of CPUs).
+        chunk_size (int, optional): number of samples added to the dataset at once.
+            Defaults to 256.
 
     Returns:
         fo.Dataset: the dataset
     """
-    # Read metadata
+    # Read metadata into columns
     with open(dir / "meta.csv", "r") as csvfile:
         reader = csv.DictReader(csvfile, delimiter=";")
         metas = [row for row in reader]
+    image_ids = [meta["Image"] for meta in metas]
+    targets = [meta["Target"] for meta in metas]
+    distances = [meta["Distance"] for meta in metas]
+    xywh = np.array(
+        [[int(meta[key]) for key in ("X", "Y", "W", "H")] for meta in metas],
+        dtype=float,
+    ).reshape(-1, 4)
 
-    samples = []
-    for meta in metas:
-        imagefp = dir / f'images/IMG{meta["Image"].zfill(4)}.jpg'
-        maskfp = dir / f'masks/mask{meta["Image"].zfill(2)}.jpg'
-        mask = cv2.imread(str(maskfp), cv2.IMREAD_GRAYSCALE)
-        height, width = mask.shape
-
-        # Get normalized bounding box coordinates from X, Y, W, H
-        bbox = np.array(
-            [
-                [
-                    int(meta["X"]) / width,
-                    int(meta["Y"]) / height,
-                    int(meta["W"]) / width,
-                    int(meta["H"]) / height,
-                ]
-            ]
-        )
-        # X and Y are the target's center, convert them to top left coordinates
-        _uncenter_boxes(bbox)
-
-        # Only keep mask values inside the bounding box
-        x, y, w, h = bbox[0]
-        x *= width
-        y *= height
-        w *= width
-        h *= height
-        mask = mask[int(y) : int(y + h), int(x) : int(x + w)]
-
-        sample = fo.Sample(filepath=imagefp)
-        sample["ground_truth"] = fo.Detections(
-            detections=[
-                fo.Detection(
-                    label=meta["Target"],
-                    bounding_box=bbox[0].tolist(),
-                    mask=mask,
-                )
-            ]
-        )
-        sample["distance"] = meta["Distance"]
-        samples.append(sample)
+    imagefps = [dir / f"images/IMG{id.zfill(4)}.jpg" for id in image_ids]
+    maskfps = [dir / f"masks/mask{id.zfill(2)}.jpg" for id in image_ids]
+    sizes = np.array([_read_image_size(fp) for fp in maskfps], dtype=float).reshape(-1, 2)
+
+    # Get normalized bounding box coordinates from X, Y, W, H
+    bboxes = xywh / np.tile(sizes, 2)
+    # X and Y are the target's center, convert them to top left coordinates
+    _uncenter_boxes(bboxes)
+
+    # Pixel coordinates of the bounding boxes, used to crop the masks
+    corners = bboxes * np.tile(sizes, 2)
+    corners[:, 2:] += corners[:, :2]
+    corners = corners.astype(int)
 
     dataset = fo.Dataset()
-    dataset.add_samples(samples)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(metas), chunk_size):
+            end = min(start + chunk_size, len(metas))
+            masks = executor.map(
+                _load_mask,
+                maskfps[start:end],
+                *corners[start:end].T.tolist(),
+            )
+
+            samples = []
+            for i, mask in zip(range(start, end), masks):
+                sample = fo.Sample(filepath=imagefps[i])
+                sample["ground_truth"] = fo.Detections(
+                    detections=[
+                        fo.Detection(
+                            label=targets[i],
+                            bounding_box=bboxes[i].tolist(),
+                            mask=mask,
+                        )
+                    ]
+                )
+                sample["distance"] = distances[i]
+                samples.append(sample)
+            dataset.add_samples(samples)
+
     return dataset
@@ -7,6 +7,8 @@ from pathlib import Path
 import requests
 from tqdm import tqdm
 
+from orion.artifacts import ArtifactStore, register_artifact
+
 LOGGER = logging.getLogger(__name__)
 
 HEADERS = {
@@ -39,6 +41,9 @@ def download_and_extract(url: str, filename: str, save_dir: Path):
         with tarfile.open(dest_file) as tf:
             tf.extractall(save_dir)
 
+    # the archive stays registered on its own (see download_file), so that it can be
+    # evicted before the extracted directory
+    register_artifact(save_dir, producer="download_and_extract", hash=False)
     LOGGER.info(f"Extracted {dest_file} to {save_dir}.")
 
 
@@ -48,6 +53,7 @@ def download_file(
     chunk_size: int = 1024,
     force: bool = False,
     sha256: str | None = None,
+    hash: bool = True,
 ) -> Path:
     """
     Download a file from given url while displaying a progress bar.
@@ -59,6 +65,8 @@ def download_file(
         force (bool, optional): if force is True and file path already exists,
             download file again. Defaults to False.
         sha256 (str | None, optional): checksum. Defaults to None.
+        hash (bool, optional): record the file's sha256 in the artifact manifest.
+            Defaults to True.
 
     Returns:
         Path: the downloaded file path
@@ -70,6 +78,7 @@ def download_file(
 
     if file_path.is_file() and not force:
         LOGGER.info(f"{file_path} already exists. Not downloading.")
+        ArtifactStore.of(file_path).touch(file_path)
         return file_path
 
     resp = requests.get(url, stream=True, headers=HEADERS)
@@ -99,4 +108,5 @@ def download_file(
                 " Please retry download."
             )
 
+    register_artifact(file_path, producer="download_file", hash=hash)
     return file_path
@@ -0,0 +1,305 @@
+import hashlib
+import logging
+import sqlite3
+import time
+from copy import copy
+from pathlib import Path
+
+import numpy as np
+import torch
+from ultralytics import (
+    YOLO,  # pyright: ignore[reportPrivateImportUsage]
+)
+from ultralytics.data.utils import IMG_FORMATS
+from ultralytics.engine.results import Results
+
+from orion.artifacts import register_artifact
+from orion.config.settings import settings
+from orion.yolo.registry import model_digest
+
+LOGGER = logging.getLogger(__name__)
+
+# number of images whose cache reads and writes are grouped in one transaction
+CHUNK_SIZE = 256
+
+
+class DetectionCache:
+    """
+    A persistent, size-bounded cache of detection results, stored in a SQLite
+    database. Entries are evicted in least recently used order once the total size
+    of the cached detections exceeds max_size bytes.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_size: int | None = None,
+    ):
+        """
+        Open (or create) a detection cache.
+
+        Args:
+            path (Path | None, optional): the cache database. Defaults to
+                ORION_HOME_DIR / "cache" / "detections.sqlite".
+            max_size (int | None, optional): maximum size of the cached detections,
+                in bytes. Defaults to settings.ORION_DETECTION_CACHE_SIZE.
+        """
+        self.path = path or settings.ORION_HOME_DIR / "cache" / "detections.sqlite"
+        self.max_size = max_size or settings.ORION_DETECTION_CACHE_SIZE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS detections (
+                key TEXT PRIMARY KEY,
+                height INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS detections_last_access
+                ON detections (last_access);
+            """)
+
+    @staticmethod
+    def key(
+        image_digest: str, model_digest: str, imgsz: int, conf: float, iou: float
+    ) -> str:
+        """
+        Build the cache key for an image's detections.
+
+        Args:
+            image_digest (str): the hash of the image file's content.
+            model_digest (str): the hash of the model weights.
+            imgsz (int): image size.
+            conf (float): confidence threshold.
+            iou (float): NMS IoU threshold.
+
+        Returns:
+            str: the key.
+        """
+        return f"{image_digest}:{model_digest}:{imgsz}:{conf}:{iou}"
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple[tuple[int, int], np.ndarray]]:
+        """
+        Get cached detections for several keys, updating their last access time in
+        a single transaction.
+
+        Args:
+            keys (list[str]): the cache keys.
+
+        Returns:
+            dict[str, tuple[tuple[int, int], np.ndarray]]: the image shape
+                (height, width) and the detections [x1, y1, x2, y2, conf, cls] of
+                each key found in the cache.
+        """
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            rows = self.conn.execute(
+                "SELECT key, height, width, data FROM detections "
+                f"WHERE key IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            for key, height, width, data in rows:
+                detections = np.frombuffer(data, dtype=np.float32).reshape(-1, 6)
+                found[key] = ((height, width), detections)
+        if found:
+            now = time.time()
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE detections SET last_access = ? WHERE key = ?",
+                    ((now, key) for key in found),
+                )
+        return found
+
+    def get(self, key: str) -> tuple[tuple[int, int], np.ndarray] | None:
+        """
+        Get cached detections.
+
+        Args:
+            key (str): the cache key.
+
+        Returns:
+            tuple[tuple[int, int], np.ndarray] | None: the image shape (height, width)
+                and the detections [x1, y1, x2, y2, conf, cls], or None if the key is
+                not in the cache.
+        """
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries: list[tuple[str, tuple[int, int], np.ndarray]]):
+        """
+        Cache detections for several keys in a single transaction.
+
+        Args:
+            entries (list[tuple[str, tuple[int, int], np.ndarray]]): the cache key,
+                image shape (height, width) and detections [x1, y1, x2, y2, conf,
+                cls] of each image.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO detections VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        key,
+                        shape[0],
+                        shape[1],
+                        detections.astype(np.float32).tobytes(),
+                        now,
+                    )
+                    for key, shape, detections in entries
+                ),
+            )
+
+    def put(self, key: str, shape: tuple[int, int], detections: np.ndarray):
+        """
+        Cache detections.
+
+        Args:
+            key (str): the cache key.
+            shape (tuple[int, int]): the image shape (height, width).
+            detections (np.ndarray): the detections [x1, y1, x2, y2, conf, cls].
+        """
+        self.put_many([(key, shape, detections)])
+
+    def size(self) -> int:
+        """
+        Return the total size of the cached detections.
+
+        Returns:
+            int: the total size of the cached detections, in bytes.
+        """
+        (size,) = self.conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(data) + LENGTH(key)), 0) FROM detections"
+        ).fetchone()
+        return size
+
+    def evict(self):
+        """
+        Evict the least recently used entries until the cache fits in max_size.
+        """
+        excess = self.size() - self.max_size
+        if excess <= 0:
+            return
+        with self.conn:
+            self.conn.execute(
+                """
+                DELETE FROM detections WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(LENGTH(data) + LENGTH(key)) OVER (
+                            ORDER BY last_access, key ROWS UNBOUNDED PRECEDING
+                        ) - (LENGTH(data) + LENGTH(key)) AS freed_before
+                        FROM detections
+                    ) WHERE freed_before < ?
+                )
+                """,
+                (excess,),
+            )
+        LOGGER.info(f"Evicted {excess} bytes from detection cache {self.path}.")
+
+
+def _file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def cached_predict(
+    model: YOLO,
+    data: Path,
+    cache: DetectionCache,
+    conf: float = 0.25,
+    iou: float = 0.7,
+    imgsz: int = 640,
+    batch: int = 1,
+) -> list[Results]:
+    """
+    Run predictions on a set of images, reusing cached detections for the images
+    whose content was already processed with the same model and settings. Cache
+    hits skip both image decoding and inference.
+
+    Args:
+        model (YOLO): the model.
+        data (Path): an image or a directory of images.
+        cache (DetectionCache): the detection cache.
+        conf (float, optional): confidence threshold. Defaults to 0.25.
+        iou (float, optional): NMS IoU threshold. Defaults to 0.7.
+        imgsz (int, optional): image size. Defaults to 640.
+        batch (int, optional): batch size for inference on cache misses.
+            Defaults to 1.
+
+    Returns:
+        list[Results]: the detection results, in the order of the images. Results
+            read from the cache do not hold the image (orig_img is a placeholder).
+    """
+    if data.is_dir():
+        images = sorted(
+            path for path in data.iterdir() if path.suffix[1:].lower() in IMG_FORMATS
+        )
+    else:
+        images = [data]
+
+    digest = model_digest(model)
+    assert digest is not None, "cached_predict requires a model with a weights file."
+    keys = [
+        DetectionCache.key(_file_digest(image), digest, imgsz, conf, iou)
+        for image in images
+    ]
+
+    results: list[Results] = []
+    hits = 0
+    # read hits and write misses in one transaction per chunk of images
+    for start in range(0, len(images), CHUNK_SIZE):
+        chunk = list(
+            zip(images[start : start + CHUNK_SIZE], keys[start : start + CHUNK_SIZE])
+        )
+        cached = cache.get_many([key for _, key in chunk])
+        hits += sum(key in cached for _, key in chunk)
+        # identical images (same key) are predicted once, and share the result
+        misses: dict[str, Path] = {}
+        for image, key in chunk:
+            if key not in cached:
+                misses.setdefault(key, image)
+        predicted: dict[str, Results] = {}
+        if misses:
+            predictions = model.predict(
+                [str(image) for image in misses.values()],
+                stream=True,
+                conf=conf,
+                iou=iou,
+                imgsz=imgsz,
+                batch=batch,
+                verbose=False,
+            )
+            predicted = dict(zip(misses, predictions))
+            cache.put_many(
+                [
+                    (key, result.orig_shape, result.boxes.data.cpu().numpy())  # type: ignore
+                    for key, result in predicted.items()
+                ]
+            )
+
+        for image, key in chunk:
+            if key in predicted:
+                result = predicted[key]
+                if result.path != str(image):
+                    result = copy(result)
+                    result.path = str(image)
+                results.append(result)
+                continue
+            (height, width), detections = cached[key]
+            placeholder = np.broadcast_to(np.zeros(1, dtype=np.uint8), (height, width, 3))
+            results.append(
+                Results(
+                    placeholder,
+                    path=str(image),
+                    names=model.names,
+                    boxes=torch.from_numpy(detections.copy()),
+                )
+            )
+
+    LOGGER.info(f"Detection cache: {hits} hits, {len(images) - hits} misses.")
+    if hits < len(images):
+        cache.evict()
+        register_artifact(cache.path, producer="detection-cache", hash=False)
+    return results
@@ -0,0 +1,267 @@
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import torch
+from ultralytics import (
+    YOLO,  # pyright: ignore[reportPrivateImportUsage]
+)
+from ultralytics.data.utils import VID_FORMATS
+from ultralytics.engine.results import Results
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.utils.metrics import box_iou
+
+from orion.yolo.streams import close_stream, open_stream, update_tracker
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class CascadeReport:
+    """
+    Summary of a cascade run.
+    """
+
+    frames: int = 0
+    escalated: int = 0
+    seconds: float = 0.0
+    baseline_seconds: float | None = None
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.escalated / max(self.frames, 1)
+
+    @property
+    def fps(self) -> float:
+        return self.frames / max(self.seconds, 1e-9)
+
+    def __str__(self) -> str:
+        report = (
+            f"Escalated {self.escalated}/{self.frames} frames "
+            f"({self.escalation_rate:.1%}) to the large model. "
+            f"Cascade throughput: {self.fps:.1f} frames/s."
+        )
+        if self.baseline_seconds is not None:
+            baseline_fps = self.frames / max(self.baseline_seconds, 1e-9)
+            report += (
+                f" Large model alone: {baseline_fps:.1f} frames/s "
+                f"(speedup x{self.fps / max(baseline_fps, 1e-9):.2f})."
+            )
+        return report
+
+
+def is_uncertain(result: Results, low: float, high: float) -> bool:
+    """
+    Return True if some of the result's detections have a confidence in the
+    [low, high[ band.
+
+    Args:
+        result (Results): detection results.
+        low (float): lower bound of the confidence band.
+        high (float): upper bound of the confidence band.
+
+    Returns:
+        bool: whether the result should be escalated to the large model.
+    """
+    if result.boxes is None or len(result.boxes) == 0:
+        return False
+    conf = result.boxes.conf
+    return bool(((conf >= low) & (conf < high)).any())
+
+
+def loses_track(
+    tracker: BYTETracker, result: Results, iou: float = 0.3, conf: float = 0.5
+) -> bool:
+    """
+    Return True if one of the tracker's active tracks has no confident detection
+    overlapping it in the result, i.e. if the track would be lost by updating the
+    tracker with this result.
+
+    Args:
+        tracker (BYTETracker): the tracker.
+        result (Results): detection results for the current frame.
+        iou (float, optional): minimum IoU between a track and a detection.
+            Defaults to 0.3.
+        conf (float, optional): minimum confidence of the detection.
+            Defaults to 0.5.
+
+    Returns:
+        bool: whether the result should be escalated to the large model.
+    """
+    active = [track.xyxy for track in tracker.tracked_stracks if track.is_activated]
+    if not active:
+        return False
+    if result.boxes is None or len(result.boxes) == 0:
+        return True
+
+    boxes = result.boxes[result.boxes.conf >= conf].xyxy
+    if len(boxes) == 0:
+        return True
+    tracks = torch.as_tensor(np.array(active), dtype=boxes.dtype, device=boxes.device)
+    return bool((box_iou(tracks, boxes).max(dim=1).values < iou).any())
+
+
+def merge_results(
+    small: Results, large: Results, high: float, iou: float = 0.5
+) -> Results:
+    """
+    Merge the results of the small and large models for the same frame. The large
+    model's detections are kept, as well as the small model's confident
+    detections (conf >= high) which do not overlap any of them.
+
+    Args:
+        small (Results): the small model's results.
+        large (Results): the large model's results.
+        high (float): confidence above which the small model's detections are kept.
+        iou (float, optional): IoU above which detections overlap. Defaults to 0.5.
+
+    Returns:
+        Results: the merged results.
+    """
+    assert small.boxes is not None and large.boxes is not None
+    large_data = torch.as_tensor(large.boxes.data)
+    small_data = torch.as_tensor(small.boxes.data)
+    confident = small_data[torch.as_tensor(small.boxes.conf) >= high]
+    confident = confident.to(large_data.device)
+    if len(confident) and len(large_data):
+        overlaps = box_iou(confident[:, :4], large_data[:, :4]).max(dim=1).values
+        confident = confident[overlaps < iou]
+
+    merged = small.new()
+    merged.update(boxes=torch.cat([large_data, confident]))
+    return merged
+
+
+def cascade_predict(
+    small: YOLO,
+    large: YOLO,
+    data: Path,
+    low: float = 0.25,
+    high: float = 0.6,
+    batch: int = 8,
+) -> tuple[list[Results], CascadeReport]:
+    """
+    Run predictions with a small model on every image, and escalate the images with
+    uncertain detections (confidence in [low, high[) to the large model.
+
+    Args:
+        small (YOLO): the screening model.
+        large (YOLO): the large model.
+        data (Path): data to make predictions on.
+        low (float, optional): lower bound of the confidence band (also the
+            confidence threshold for detections). Defaults to 0.25.
+        high (float, optional): upper bound of the confidence band. Defaults to 0.6.
+        batch (int, optional): number of escalated images per forward pass of the
+            large model. Defaults to 8.
+
+    Returns:
+        tuple[list[Results], CascadeReport]: the results and the cascade report.
+    """
+    report = CascadeReport()
+    results: list[Results] = []
+    pending: list[int] = []
+
+    def escalate():
+        images = [results[i].orig_img for i in pending]
+        for i, large_result in zip(
+            pending, large.predict(images, conf=low, verbose=False)
+        ):
+            large_result.path = results[i].path
+            results[i] = merge_results(results[i], large_result, high)
+        pending.clear()
+
+    start = time.perf_counter()
+    for result in small.predict(data, conf=low, stream=True, verbose=False):
+        results.append(result)
+        if is_uncertain(result, low, high):
+            pending.append(len(results) - 1)
+            report.escalated += 1
+            if len(pending) >= batch:
+                escalate()
+    if pending:
+        escalate()
+    report.seconds = time.perf_counter() - start
+    report.frames = len(results)
+    return results, report
+
+
+def cascade_track(
+    small: YOLO,
+    large: YOLO,
+    data: Path,
+    low: float = 0.25,
+    high: float = 0.6,
+    tracker: str = "botsort.yaml",
+    save_dir: Path | None = None,
+) -> CascadeReport:
+    """
+    Track objects in a video with a small model, and escalate the frames with
+    uncertain detections (confidence in [low, high[) or in which the tracker would
+    lose a track to the large model.
+
+    Args:
+        small (YOLO): the screening model.
+        large (YOLO): the large model.
+        data (Path): the input video.
+        low (float, optional): lower bound of the confidence band (also the
+            confidence threshold for detections). Defaults to 0.25.
+        high (float, optional): upper bound of the confidence band. Defaults to 0.6.
+        tracker (str, optional): the tracker configuration file.
+            Defaults to "botsort.yaml".
+        save_dir (Path | None, optional): directory to save the annotated video to.
+            Defaults to None.
+
+    Returns:
+        CascadeReport: the cascade report.
+    """
+    report = CascadeReport()
+    stream = open_stream(data, tracker, save_dir)
+    start = time.perf_counter()
+    try:
+        while True:
+            ok, frame = stream.capture.read()
+            if not ok:
+                break
+
+            result = small.predict(frame, conf=low, verbose=False)[0]
+            if is_uncertain(result, low, high) or loses_track(
+                stream.tracker, result, conf=low
+            ):
+                large_result = large.predict(frame, conf=low, verbose=False)[0]
+                result = merge_results(result, large_result, high)
+                report.escalated += 1
+
+            tracked = update_tracker(stream.tracker, result)
+            stream.frames += 1
+            if stream.writer is not None:
+                stream.writer.write(tracked.plot())
+    finally:
+        close_stream(stream)
+    report.seconds = time.perf_counter() - start
+    report.frames = stream.frames
+    return report
+
+
+def time_baseline(large: YOLO, data: Path, conf: float = 0.25) -> float:
+    """
+    Time the large model alone on the same data, for comparison with the cascade.
+
+    Args:
+        large (YOLO): the large model.
+        data (Path): the images or video.
+        conf (float, optional): confidence threshold for detections.
+            Defaults to 0.25.
+
+    Returns:
+        float: the elapsed time, in seconds.
+    """
+    start = time.perf_counter()
+    if data.suffix[1:].lower() in VID_FORMATS:
+        for _ in large.track(data, conf=conf, stream=True, verbose=False):
+            pass
+    else:
+        for _ in large.predict(data, conf=conf, stream=True, verbose=False):
+            pass
+    return time.perf_counter() - start
@@ -0,0 +1,436 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+import torch
+from ultralytics.engine.results import Results
+from ultralytics.trackers.utils.matching import linear_assignment
+from ultralytics.utils.metrics import box_iou
+
+from orion.yolo.registry import load_model, resolve_model
+from orion.yolo.streams import load_tracker, update_tracker
+
+LOGGER = logging.getLogger(__name__)
+
+MOT_FILE = "tracks.txt"
+
+
+def keyframes(video: Path) -> list[int] | None:
+    """
+    List the keyframes of a video with ffprobe, without decoding it. Keyframe
+    timestamps are taken relative to the stream's start time, which is the time of
+    the first frame decoded by OpenCV.
+
+    Args:
+        video (Path): the video.
+
+    Returns:
+        list[int] | None: the keyframe indices, or None if ffprobe is not available
+            or failed.
+    """
+    if shutil.which("ffprobe") is None:
+        return None
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=start_time:packet=pts_time,flags",
+        "-of",
+        "json",
+        str(video),
+    ]
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        LOGGER.warning(f"ffprobe failed on {video}: {e.stderr.strip()}")
+        return None
+
+    probe = json.loads(output.stdout)
+    streams = probe.get("streams") or [{}]
+    start_time = float(streams[0].get("start_time", 0) or 0)
+    capture = cv2.VideoCapture(str(video))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    capture.release()
+    frames: list[int] = []
+    for packet in probe.get("packets", []):
+        pts_time = packet.get("pts_time", "N/A")
+        if "K" in packet.get("flags", "") and pts_time != "N/A":
+            frames.append(max(round((float(pts_time) - start_time) * fps), 0))
+    return sorted(set(frames))
+
+
+def split_video(
+    video: Path, chunks: int, keys: list[int] | None = None
+) -> list[tuple[int, int | None]]:
+    """
+    Split a video into time chunks of about the same length. Chunk boundaries are
+    moved to the nearest keyframe when ffprobe is available, so that workers can
+    seek to the start of their chunk without decoding the previous frames.
+
+    Args:
+        video (Path): the video.
+        chunks (int): the number of chunks.
+        keys (list[int] | None, optional): the video's keyframes. Listed with
+            `keyframes` if None. Defaults to None.
+
+    Returns:
+        list[tuple[int, int | None]]: the first frame and end frame (exclusive) of
+            each chunk. The last chunk's end is None (end of the video).
+    """
+    capture = cv2.VideoCapture(str(video))
+    n_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+
+    boundaries = [round(i * n_frames / chunks) for i in range(1, chunks)]
+    if keys is None:
+        keys = keyframes(video)
+    if keys:
+        keys_array = np.array(keys, dtype=np.int64)
+        boundaries = [
+            int(keys_array[int(np.argmin(np.abs(keys_array - boundary)))])
+            for boundary in boundaries
+        ]
+    else:
+        LOGGER.info("Keyframes unavailable, splitting the video uniformly.")
+    boundaries = sorted({b for b in boundaries if 0 < b < n_frames})
+    starts = [0, *boundaries]
+    ends: list[int | None] = [*boundaries, None]
+    return list(zip(starts, ends))
+
+
+def track_chunk(
+    model: str,
+    video: Path,
+    start: int,
+    end: int | None,
+    overlap: int = 30,
+    conf: float = 0.5,
+    tracker: str = "botsort.yaml",
+    imgsz: int = 640,
+    threads: int | None = None,
+    batch: int = 8,
+    keys: list[int] | None = None,
+) -> npt.NDArray[np.floating]:
+    """
+    Track objects in a chunk of a video, starting overlap frames before the chunk
+    (or at the previous keyframe) so that tracks can be matched with the previous
+    chunk's. Detection runs on batches of frames, and the tracker is updated frame
+    by frame.
+
+    Args:
+        model (str): the model name or path.
+        video (Path): the video.
+        start (int): the chunk's first frame.
+        end (int | None): the chunk's end frame (exclusive), or None for the end
+            of the video.
+        overlap (int, optional): number of frames tracked before start.
+            Defaults to 30.
+        conf (float, optional): confidence threshold for detections. Defaults to 0.5.
+        tracker (str, optional): the tracker configuration file.
+            Defaults to "botsort.yaml".
+        imgsz (int, optional): image size. Defaults to 640.
+        threads (int | None, optional): number of torch threads. Defaults to None.
+        batch (int, optional): number of frames per forward pass. Defaults to 8.
+        keys (list[int] | None, optional): the video's keyframes. Defaults to None.
+
+    Returns:
+        npt.NDArray[np.floating]: the tracks [frame, id, x1, y1, x2, y2, conf, cls],
+            with the chunk's own track ids.
+    """
+    if threads is not None:
+        torch.set_num_threads(threads)
+    yolo = load_model(model)
+    chunk_tracker = load_tracker(tracker)
+    capture = cv2.VideoCapture(str(video))
+    seek = max(start - overlap, 0)
+    if keys:
+        seek = max((key for key in keys if key <= seek), default=0)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, seek)
+    # the decoder may not land on the requested frame: number frames from where it did
+    frame_index = int(capture.get(cv2.CAP_PROP_POS_FRAMES))
+    if frame_index != seek:
+        LOGGER.warning(f"Seeking to frame {seek} of {video} landed on {frame_index}.")
+
+    rows = []
+    done = False
+    while not done:
+        frames: list[np.ndarray] = []
+        while len(frames) < batch and (end is None or frame_index + len(frames) < end):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(frame)
+        done = len(frames) < batch
+        if not frames:
+            break
+        for result in yolo.predict(frames, conf=conf, imgsz=imgsz, verbose=False):
+            tracked = update_tracker(chunk_tracker, result)
+            assert tracked.boxes is not None
+            data = torch.as_tensor(tracked.boxes.data).cpu().numpy()
+            if len(data) and data.shape[1] == 7:
+                rows.append(
+                    np.column_stack(
+                        [
+                            np.full(len(data), frame_index),
+                            data[:, 4],
+                            data[:, :4],
+                            data[:, 5:],
+                        ]
+                    )
+                )
+            frame_index += 1
+    capture.release()
+    return np.concatenate(rows) if rows else np.zeros((0, 8))
+
+
+def match_tracks(
+    previous: npt.NDArray[np.floating],
+    current: npt.NDArray[np.floating],
+    iou: float = 0.5,
+) -> dict[int, int]:
+    """
+    Match the tracks of two chunks in their overlap window. The score of a pair of
+    tracks is the sum of their IoU over the window's frames, divided by the number
+    of frames in which the longest of the two appears, and pairs are matched with
+    the Hungarian algorithm.
+
+    Args:
+        previous (npt.NDArray[np.floating]): the previous chunk's tracks in the
+            window [frame, id, x1, y1, x2, y2, conf, cls].
+        current (npt.NDArray[np.floating]): the current chunk's tracks in the
+            window.
+        iou (float, optional): minimum score of a match. Defaults to 0.5.
+
+    Returns:
+        dict[int, int]: the previous chunk's track id for each matched track id of
+            the current chunk.
+    """
+    previous_ids, previous_counts = np.unique(previous[:, 1], return_counts=True)
+    current_ids, current_counts = np.unique(current[:, 1], return_counts=True)
+    scores = np.zeros((len(previous_ids), len(current_ids)))
+    for frame in np.intersect1d(previous[:, 0], current[:, 0]):
+        a = previous[previous[:, 0] == frame]
+        b = current[current[:, 0] == frame]
+        ious = box_iou(torch.from_numpy(a[:, 2:6]), torch.from_numpy(b[:, 2:6])).numpy()
+        rows = np.searchsorted(previous_ids, a[:, 1])
+        cols = np.searchsorted(current_ids, b[:, 1])
+        scores[np.ix_(rows, cols)] += ious
+    scores /= np.maximum(previous_counts[:, None], current_counts[None, :])
+
+    matches, _, _ = linear_assignment(1 - scores, thresh=1 - iou)
+    return {int(current_ids[j]): int(previous_ids[i]) for i, j in matches}
+
+
+def stitch_tracks(
+    chunks: list[tuple[int, int | None]],
+    tracks: list[npt.NDArray[np.floating]],
+    overlap: int = 30,
+    iou: float = 0.5,
+) -> npt.NDArray[np.floating]:
+    """
+    Stitch the tracks of consecutive chunks into a single set of track ids. Tracks
+    of a chunk which match a track of the previous chunk in their overlap window
+    take its id, and other tracks get new ids. Each frame's tracks are taken from
+    the chunk which owns the frame.
+
+    Args:
+        chunks (list[tuple[int, int | None]]): the first and end frame of each
+            chunk.
+        tracks (list[npt.NDArray[np.floating]]): the tracks of each chunk
+            [frame, id, x1, y1, x2, y2, conf, cls].
+        overlap (int, optional): number of frames tracked before each chunk.
+            Defaults to 30.
+        iou (float, optional): minimum score to match two tracks. Defaults to 0.5.
+
+    Returns:
+        npt.NDArray[np.floating]: the stitched tracks.
+    """
+    next_id = 1
+    stitched = []
+    previous: npt.NDArray[np.floating] | None = None
+    for (start, _), chunk_tracks in zip(chunks, tracks):
+        mapping: dict[int, int] = {}
+        if previous is not None and len(chunk_tracks):
+            window = (start - overlap, start)
+            mapping = match_tracks(
+                previous[(previous[:, 0] >= window[0]) & (previous[:, 0] < window[1])],
+                chunk_tracks[
+                    (chunk_tracks[:, 0] >= window[0]) & (chunk_tracks[:, 0] < window[1])
+                ],
+                iou,
+            )
+        for local_id in np.unique(chunk_tracks[:, 1]).astype(int):
+            if local_id not in mapping:
+                mapping[local_id] = next_id
+                next_id += 1
+
+        chunk_tracks = chunk_tracks.copy()
+        chunk_tracks[:, 1] = [mapping[int(i)] for i in chunk_tracks[:, 1]]
+        stitched.append(chunk_tracks[chunk_tracks[:, 0] >= start])
+        previous = chunk_tracks
+    return np.concatenate(stitched) if stitched else np.zeros((0, 8))
+
+
+def save_mot(tracks: npt.NDArray[np.floating], path: Path):
+    """
+    Save tracks in MOT format: frame (from 1), id, left, top, width, height,
+    confidence, class, -1, -1.
+
+    Args:
+        tracks (npt.NDArray[np.floating]): the tracks
+            [frame, id, x1, y1, x2, y2, conf, cls].
+        path (Path): the output file.
+    """
+    tracks = tracks[np.lexsort((tracks[:, 1], tracks[:, 0]))]
+    mot = np.column_stack(
+        [
+            tracks[:, 0] + 1,
+            tracks[:, 1],
+            tracks[:, 2:4],
+            tracks[:, 4:6] - tracks[:, 2:4],
+            tracks[:, 6:8],
+            -np.ones((len(tracks), 2)),
+        ]
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savetxt(
+        path,
+        mot,
+        fmt=["%d", "%d", "%.2f", "%.2f", "%.2f", "%.2f", "%.4f", "%d", "%d", "%d"],
+        delimiter=",",
+    )
+
+
+def render_tracks(
+    video: Path, tracks: npt.NDArray[np.floating], names: dict[int, str], path: Path
+):
+    """
+    Render tracks on a video.
+
+    Args:
+        video (Path): the input video.
+        tracks (npt.NDArray[np.floating]): the tracks
+            [frame, id, x1, y1, x2, y2, conf, cls].
+        names (dict[int, str]): the class names.
+        path (Path): the output video.
+    """
+    capture = cv2.VideoCapture(str(video))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    writer = cv2.VideoWriter(
+        str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)  # type: ignore
+    )
+
+    tracks = tracks[np.argsort(tracks[:, 0], kind="stable")]
+    frame_starts = np.searchsorted(tracks[:, 0], np.arange(tracks[-1, 0] + 2))
+    frame_index = 0
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        boxes: npt.NDArray[np.floating] = np.zeros((0, 7))
+        if frame_index + 1 < len(frame_starts):
+            frame_tracks = tracks[
+                frame_starts[frame_index] : frame_starts[frame_index + 1]
+            ]
+            boxes = frame_tracks[:, [2, 3, 4, 5, 1, 6, 7]]
+        result = Results(
+            frame, path=str(video), names=names, boxes=torch.from_numpy(boxes)
+        )
+        writer.write(result.plot())
+        frame_index += 1
+    capture.release()
+    writer.release()
+
+
+def track_chunks(
+    model: str,
+    video: Path,
+    workers: int = 4,
+    overlap: int = 30,
+    conf: float = 0.5,
+    tracker: str = "botsort.yaml",
+    imgsz: int = 640,
+    output: Path = Path("runs/track"),
+    save: bool = False,
+) -> Path:
+    """
+    Track objects in a long video by splitting it into time chunks, tracking each
+    chunk in a separate worker process, and stitching track ids across chunk
+    boundaries. The stitched tracks are saved in MOT format.
+
+    Args:
+        model (str): the model name or path.
+        video (Path): the video.
+        workers (int, optional): number of worker processes (and chunks).
+            Defaults to 4.
+        overlap (int, optional): number of frames tracked before each chunk to
+            match tracks with the previous chunk. Defaults to 30.
+        conf (float, optional): confidence threshold for detections. Defaults to 0.5.
+        tracker (str, optional): the tracker configuration file.
+            Defaults to "botsort.yaml".
+        imgsz (int, optional): image size. Defaults to 640.
+        output (Path, optional): the save directory. Defaults to Path("runs/track").
+        save (bool, optional): also render the tracks on the video.
+            Defaults to False.
+
+    Returns:
+        Path: the MOT tracks file.
+    """
+    model = str(resolve_model(model))
+    keys = keyframes(video)
+    chunks = split_video(video, workers, keys)
+    threads = max((os.cpu_count() or 1) // len(chunks), 1)
+    LOGGER.info(f"Tracking {video} in {len(chunks)} chunks with {threads} threads each.")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(len(chunks), mp_context=get_context("spawn")) as pool:
+        futures = [
+            pool.submit(
+                track_chunk,
+                model,
+                video,
+                chunk_start,
+                chunk_end,
+                overlap,
+                conf,
+                tracker,
+                imgsz,
+                threads,
+                keys=keys,
+            )
+            for chunk_start, chunk_end in chunks
+        ]
+        tracks = [future.result() for future in futures]
+    stitched = stitch_tracks(chunks, tracks, overlap)
+    elapsed = time.perf_counter() - start
+
+    mot_file = output / MOT_FILE
+    save_mot(stitched, mot_file)
+    capture = cv2.VideoCapture(str(video))
+    n_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    LOGGER.info(
+        f"Tracked {len(np.unique(stitched[:, 1]))} tracks over {n_frames} frames "
+        f"in {elapsed:.1f}s "
+        f"({n_frames / max(elapsed, 1e-9):.1f} frames/s)."
+    )
+
+    if save and len(stitched):
+        render_tracks(
+            video, stitched, load_model(model).names, output / f"{video.stem}.mp4"
+        )
+    return mot_file
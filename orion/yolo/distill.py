@@ -0,0 +1,348 @@
+import hashlib
+import json
+import logging
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from ultralytics import (
+    YOLO,  # pyright: ignore[reportPrivateImportUsage]
+)
+from ultralytics.data.utils import IMG_FORMATS
+from ultralytics.nn.tasks import yaml_model_load
+from ultralytics.utils import YAML
+
+from orion.artifacts import register_artifact
+from orion.config.settings import settings
+from orion.yolo.registry import model_digest
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _list_images(images_dir: Path) -> list[Path]:
+    return sorted(
+        path for path in images_dir.rglob("*") if path.suffix[1:].lower() in IMG_FORMATS
+    )
+
+
+def _images_digest(images_dir: Path) -> str:
+    # images added to or removed from the directory update its modification time
+    resolved = images_dir.resolve()
+    key = f"{resolved}:{resolved.stat().st_mtime_ns}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def cache_teacher_labels(
+    teacher: YOLO,
+    images_dir: Path,
+    cache_dir: Path,
+    conf: float = 0.5,
+    imgsz: int = 640,
+    batch: int = 16,
+) -> Path:
+    """
+    Predict pseudo-labels for every image in images_dir with the teacher model, and
+    save them in YOLO format in cache_dir. Images which already have a label file
+    in cache_dir are skipped, so that the teacher only runs once per image.
+
+    Args:
+        teacher (YOLO): the teacher model.
+        images_dir (Path): the images directory.
+        cache_dir (Path): the directory to save pseudo-labels to.
+        conf (float, optional): confidence threshold for pseudo-labels.
+            Defaults to 0.5.
+        imgsz (int, optional): image size. Defaults to 640.
+        batch (int, optional): batch size. Defaults to 16.
+
+    Returns:
+        Path: the pseudo-labels directory.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    images = [
+        image
+        for image in _list_images(images_dir)
+        if not (cache_dir / f"{image.stem}.txt").exists()
+    ]
+    LOGGER.info(f"Predicting pseudo-labels for {len(images)} images with the teacher.")
+    for start in range(0, len(images), batch):
+        chunk = [str(image) for image in images[start : start + batch]]
+        for image, result in zip(
+            chunk, teacher.predict(chunk, conf=conf, imgsz=imgsz, verbose=False)
+        ):
+            # an empty label file marks the image as processed
+            label_file = cache_dir / f"{Path(image).stem}.txt"
+            label_file.touch()
+            result.save_txt(label_file)
+    return cache_dir
+
+
+def _dataset_root(cfg: dict, data: Path) -> Path:
+    root = Path(cfg.get("path") or data.parent)
+    if not root.is_absolute():
+        root = (data.parent / root).resolve()
+    return root
+
+
+def _read_labels(label_file: Path) -> npt.NDArray[np.floating]:
+    if not label_file.exists():
+        return np.zeros((0, 5))
+    return np.loadtxt(label_file, ndmin=2).reshape(-1, 5)
+
+
+def _xywh_iou(
+    boxes1: npt.NDArray[np.floating], boxes2: npt.NDArray[np.floating]
+) -> npt.NDArray[np.floating]:
+    """
+    IoU between two sets of boxes in centered [x, y, w, h] format.
+    """
+    top_left = np.maximum(
+        boxes1[:, None, :2] - boxes1[:, None, 2:] / 2,
+        boxes2[None, :, :2] - boxes2[None, :, 2:] / 2,
+    )
+    bottom_right = np.minimum(
+        boxes1[:, None, :2] + boxes1[:, None, 2:] / 2,
+        boxes2[None, :, :2] + boxes2[None, :, 2:] / 2,
+    )
+    inter = np.clip(bottom_right - top_left, 0, None).prod(2)
+    area1 = boxes1[:, 2:].prod(1)
+    area2 = boxes2[:, 2:].prod(1)
+    return inter / (area1[:, None] + area2[None, :] - inter + 1e-9)
+
+
+def merge_labels(
+    labels: npt.NDArray[np.floating],
+    pseudo_labels: npt.NDArray[np.floating],
+    iou: float = 0.5,
+) -> npt.NDArray[np.floating]:
+    """
+    Merge ground truth labels with the teacher's pseudo-labels, keeping the
+    pseudo-labels which do not overlap any ground truth box.
+
+    Args:
+        labels (npt.NDArray[np.floating]): ground truth labels [cls, x, y, w, h].
+        pseudo_labels (npt.NDArray[np.floating]): pseudo-labels [cls, x, y, w, h].
+        iou (float, optional): IoU above which boxes overlap. Defaults to 0.5.
+
+    Returns:
+        npt.NDArray[np.floating]: the merged labels.
+    """
+    if len(labels) and len(pseudo_labels):
+        overlaps = _xywh_iou(pseudo_labels[:, 1:], labels[:, 1:]).max(1)
+        pseudo_labels = pseudo_labels[overlaps < iou]
+    return np.concatenate([labels, pseudo_labels])
+
+
+def build_distill_dataset(
+    data: Path, pseudo_labels_dir: Path, output: Path, split: str = "train"
+) -> Path:
+    """
+    Create a copy of a YOLO dataset whose training labels are the ground truth
+    labels merged with the teacher's pseudo-labels. Images are symlinked one by one
+    (ultralytics resolves a symlinked directory, and would then read the original
+    labels), and the validation split still points to the original dataset.
+
+    Args:
+        data (Path): the dataset.yaml file.
+        pseudo_labels_dir (Path): the teacher's pseudo-labels directory.
+        output (Path): the output directory.
+        split (str, optional): the split to distill. Defaults to "train".
+
+    Returns:
+        Path: the distillation dataset.yaml file.
+    """
+    cfg = YAML.load(data)
+    root = _dataset_root(cfg, data)
+    images_dir = root / cfg[split]
+    labels_dir = Path(str(images_dir).replace("/images/", "/labels/"))
+
+    images_out = output / "images" / split
+    if images_out.is_symlink():
+        images_out.unlink()
+    elif images_out.exists():
+        shutil.rmtree(images_out)
+    (output / "labels" / split).mkdir(parents=True, exist_ok=True)
+
+    for image in _list_images(images_dir):
+        link = images_out / image.relative_to(images_dir)
+        link.parent.mkdir(parents=True, exist_ok=True)
+        link.symlink_to(image.resolve())
+        label_file = image.relative_to(images_dir).with_suffix(".txt")
+        labels = merge_labels(
+            _read_labels(labels_dir / label_file),
+            _read_labels(pseudo_labels_dir / f"{image.stem}.txt"),
+        )
+        dest = output / "labels" / split / label_file
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        np.savetxt(dest, labels, fmt=["%d"] + ["%.6f"] * 4)
+
+    distill_cfg = dict(cfg)
+    distill_cfg["path"] = str(output.resolve())
+    distill_cfg[split] = f"images/{split}"
+    for key in ("train", "val", "test"):
+        if key != split and key in cfg:
+            distill_cfg[key] = str(root / cfg[key])
+    distill_data = output / "dataset.yaml"
+    YAML.save(distill_data, distill_cfg)
+    return distill_data
+
+
+def narrow_model(model: str, width: float, output: Path) -> Path:
+    """
+    Create a model configuration with a custom width multiple from a YOLO model
+    configuration (e.g. "yolo12n.yaml").
+
+    Args:
+        model (str): the model configuration.
+        width (float): the width multiple.
+        output (Path): the directory to save the configuration to.
+
+    Returns:
+        Path: the new model configuration.
+    """
+    cfg = yaml_model_load(model)
+    scale = cfg["scale"] or next(iter(cfg["scales"]))
+    depth, _, max_channels = cfg["scales"][scale]
+    cfg["scales"] = {scale: [depth, width, max_channels]}
+    for key in ("scale", "yaml_file"):
+        cfg.pop(key, None)
+
+    output.mkdir(parents=True, exist_ok=True)
+    model_cfg = output / f"{Path(model).stem}-w{width}.yaml"
+    YAML.save(model_cfg, cfg)
+    return model_cfg
+
+
+def benchmark(model: YOLO, images: list[Path], imgsz: int = 640) -> float:
+    """
+    Measure a model's mean inference time per image.
+
+    Args:
+        model (YOLO): the model.
+        images (list[Path]): the images.
+        imgsz (int, optional): image size. Defaults to 640.
+
+    Returns:
+        float: the mean inference time, in milliseconds.
+    """
+    model.predict(str(images[0]), imgsz=imgsz, verbose=False)  # warmup
+    start = time.perf_counter()
+    for image in images:
+        model.predict(str(image), imgsz=imgsz, verbose=False)
+    return (time.perf_counter() - start) * 1000 / max(len(images), 1)
+
+
+def distillation_report(
+    teacher: YOLO,
+    student: YOLO,
+    data: Path,
+    imgsz: int = 640,
+    device: str = "",
+    n_images: int = 100,
+) -> dict[str, dict[str, float]]:
+    """
+    Compare the accuracy and speed of the teacher and student models on the
+    validation split of a dataset.
+
+    Args:
+        teacher (YOLO): the teacher model.
+        student (YOLO): the student model.
+        data (Path): the dataset.yaml file.
+        imgsz (int, optional): image size. Defaults to 640.
+        device (str, optional): device to use. Defaults to ''.
+        n_images (int, optional): number of images used to measure inference time.
+            Defaults to 100.
+
+    Returns:
+        dict[str, dict[str, float]]: mAP50, mAP50-95 and inference time (ms) of
+            the teacher and student.
+    """
+    cfg = YAML.load(data)
+    root = _dataset_root(cfg, data)
+    images = _list_images(root / cfg["val"])[:n_images]
+
+    report = {}
+    for name, model in (("teacher", teacher), ("student", student)):
+        metrics = model.val(data=data, imgsz=imgsz, device=device, plots=False)
+        report[name] = {
+            "mAP50": float(metrics.box.map50),
+            "mAP50-95": float(metrics.box.map),
+            "ms_per_image": benchmark(model, images, imgsz),
+        }
+    return report
+
+
+def distill(
+    teacher: YOLO,
+    student: YOLO,
+    data: Path,
+    output: Path,
+    epochs: int = 60,
+    imgsz: int = 640,
+    batch: int = 16,
+    device: str = "",
+    conf: float = 0.5,
+) -> dict[str, dict[str, float]]:
+    """
+    Train a student model on a dataset whose labels are augmented with the
+    pseudo-labels of a frozen teacher model. The teacher's pseudo-labels are
+    computed once and cached in ORION_HOME_DIR / "distill", keyed by the teacher's
+    weights, the training images directory and the prediction settings.
+
+    Args:
+        teacher (YOLO): the teacher model.
+        student (YOLO): the student model.
+        data (Path): the dataset.yaml file.
+        output (Path): the save directory.
+        epochs (int, optional): epochs. Defaults to 60.
+        imgsz (int, optional): image size. Defaults to 640.
+        batch (int, optional): batch size. Defaults to 16.
+        device (str, optional): device to use. Defaults to ''.
+        conf (float, optional): confidence threshold for pseudo-labels.
+            Defaults to 0.5.
+
+    Returns:
+        dict[str, dict[str, float]]: the distillation report.
+    """
+    cfg = YAML.load(data)
+    root = _dataset_root(cfg, data)
+
+    digest = model_digest(teacher)
+    if digest is None:
+        raise ValueError("The teacher model must be loaded from a weights file.")
+    images_dir = root / cfg["train"]
+    cache_dir = (
+        settings.ORION_HOME_DIR
+        / "distill"
+        / f"{digest[:16]}_{_images_digest(images_dir)[:16]}_{imgsz}_{conf}"
+    )
+    pseudo_labels_dir = cache_teacher_labels(
+        teacher, images_dir, cache_dir / "labels", conf, imgsz, batch
+    )
+    register_artifact(cache_dir, producer="distill", hash=False)
+    distill_data = build_distill_dataset(data, pseudo_labels_dir, output / "data")
+
+    LOGGER.info(f"Training student. Output saved to [bold green]{output}[/].")
+    student.train(
+        data=distill_data,
+        epochs=epochs,
+        imgsz=imgsz,
+        batch=batch,
+        device=device,
+        project=output,
+        name="train",
+        exist_ok=True,
+    )
+    student = YOLO(output / "train" / "weights" / "best.pt")
+
+    report = distillation_report(teacher, student, data, imgsz, device)
+    with open(output / "distill_report.json", "w") as f:
+        json.dump(report, f, indent=2)
+    for name, metrics in report.items():
+        LOGGER.info(
+            f"{name}: mAP50={metrics['mAP50']:.3f}, "
+            f"mAP50-95={metrics['mAP50-95']:.3f}, "
+            f"{metrics['ms_per_image']:.1f} ms/image"
+        )
+    return report
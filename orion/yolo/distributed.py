@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+import torch
+import torch.distributed as dist
+import ultralytics
+from torch import nn
+from ultralytics import (
+    YOLO,  # pyright: ignore[reportPrivateImportUsage]
+)
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.nn.tasks import load_checkpoint
+from ultralytics.utils import DEFAULT_CFG, RANK
+from ultralytics.utils.torch_utils import strip_optimizer
+
+LOGGER = logging.getLogger(__name__)
+
+SCALING_REPORT_FILE = "scaling_report.json"
+# set by `launch` in the environment of each rank, like RANK and LOCAL_RANK
+WORLD_SIZE = int(os.environ.get("WORLD_SIZE", 1))
+
+
+class CPUDistributedTrainer(DetectionTrainer):
+    """
+    A detection trainer for distributed data-parallel training on CPUs, over the
+    gloo backend. Each rank is a separate process whose RANK, LOCAL_RANK and
+    WORLD_SIZE are set in its environment (see `launch`), and the rendezvous uses
+    the MASTER_ADDR and MASTER_PORT environment variables. The training data is
+    sharded across ranks by ultralytics' distributed sampler.
+    """
+
+    def __init__(self, cfg=DEFAULT_CFG, overrides: dict | None = None, _callbacks=None):
+        # the dataloaders must be built apart from _setup_train to be sharded by rank
+        if not hasattr(DetectionTrainer, "_build_train_pipeline"):
+            raise RuntimeError(
+                "CPU distributed training requires ultralytics>=8.4.13, "
+                f"found {ultralytics.__version__}."
+            )
+        overrides = {**(overrides or {}), "device": "cpu"}
+        super().__init__(cfg, overrides, _callbacks)
+        # ultralytics only counts GPUs in world_size, and AMP is CUDA only
+        self.world_size = WORLD_SIZE
+        self.args.amp = False
+
+    def _setup_ddp(self):
+        """
+        Initialize the gloo process group.
+        """
+        dist.init_process_group(
+            backend="gloo",
+            timeout=timedelta(hours=3),
+            rank=RANK,
+            world_size=self.world_size,
+        )
+
+    def _setup_train(self):
+        """
+        Set up training without ultralytics' DDP wrapping, which pins the model to a
+        GPU, then wrap the model for CPU data-parallel training.
+        """
+        self._world_size, self.world_size = self.world_size, 1
+        try:
+            super()._setup_train()
+        finally:
+            self.world_size = self._world_size
+        if self.world_size > 1:
+            self.model = nn.parallel.DistributedDataParallel(
+                self.model, device_ids=None, find_unused_parameters=True
+            )
+
+    def _build_train_pipeline(self):
+        """
+        Build the dataloaders with the real world size, so that each rank gets a
+        shard of the data and batch // world_size images per batch.
+        """
+        self.world_size = getattr(self, "_world_size", self.world_size)
+        super()._build_train_pipeline()
+
+    def final_eval(self) -> None:
+        """
+        Validate the best weights on CPU. Under DDP, ultralytics' final validation
+        places the model on the GPU of each rank, so the best weights are broadcast
+        from rank 0, loaded in the EMA model and validated through the training
+        path instead, which uses the trainer's device and shards the validation
+        data across ranks.
+        """
+        if self.world_size <= 1:
+            super().final_eval()
+            return
+
+        state: list[dict | None] = [None]
+        if RANK == 0:
+            ckpt = strip_optimizer(self.last) if self.last.exists() else {}
+            if self.best.exists():
+                strip_optimizer(
+                    self.best, updates={"train_results": ckpt.get("train_results")}
+                )
+                best, _ = load_checkpoint(self.best)
+                state = [best.state_dict()]
+        dist.broadcast_object_list(state, 0)
+        if state[0] is None or self.ema is None:
+            return
+
+        LOGGER.info(f"Validating {self.best}...")
+        self.ema.ema.load_state_dict(state[0])
+        self.validator.args.plots = self.args.plots
+        self.metrics = self.validator(trainer=self)
+        if self.metrics is not None:
+            self.metrics.pop("fitness", None)
+        self.run_callbacks("on_fit_epoch_end")
+
+
+def _scaling_report(trainer: DetectionTrainer, seconds: float, baseline: float | None):
+    epochs = trainer.epoch - trainer.start_epoch + 1
+    images = len(trainer.train_loader.dataset) * epochs  # type: ignore
+    throughput = images / seconds
+    world_size = max(trainer.world_size, 1)
+    report: dict[str, Any] = {
+        "world_size": world_size,
+        "epochs": epochs,
+        "images": images,
+        "seconds": seconds,
+        "images_per_second": throughput,
+        "baseline_images_per_second": baseline,
+        "speedup": throughput / baseline if baseline else None,
+        "efficiency": throughput / (baseline * world_size) if baseline else None,
+    }
+    with open(Path(trainer.save_dir) / SCALING_REPORT_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+    message = f"{world_size} ranks: {throughput:.1f} images/s"
+    if baseline:
+        message += (
+            f", {report['speedup']:.2f}x speedup over {baseline:.1f} images/s, "
+            f"{report['efficiency']:.0%} scaling efficiency"
+        )
+    LOGGER.info(message)
+    return report
+
+
+def add_scaling_report(model: YOLO, baseline: float | None = None):
+    """
+    Save a scaling report (training throughput, and speedup and scaling efficiency
+    against a baseline throughput) to the save directory at the end of training.
+    A single-process run's report gives the baseline for distributed runs.
+
+    Args:
+        model (YOLO): the model to train.
+        baseline (float | None, optional): single-process throughput (images/s).
+            Defaults to None.
+    """
+    start = time.perf_counter()
+
+    def on_train_end(trainer: DetectionTrainer):
+        if RANK in {-1, 0}:
+            _scaling_report(trainer, time.perf_counter() - start, baseline)
+
+    model.add_callback("on_train_end", on_train_end)
+
+
+def train_rank(config: dict[str, Any]):
+    """
+    Run training on one rank. The rank's environment must be set by `launch`.
+
+    Args:
+        config (dict[str, Any]): the model, baseline throughput and training
+            arguments.
+    """
+    torch.set_num_threads(int(os.environ.get("OMP_NUM_THREADS", torch.get_num_threads())))
+    model = YOLO(config["model"])
+    add_scaling_report(model, config["baseline"])
+    model.train(trainer=CPUDistributedTrainer, **config["train_args"])
+
+
+def launch(
+    model: str,
+    train_args: dict[str, Any],
+    nnodes: int = 1,
+    nproc_per_node: int = 1,
+    node_rank: int = 0,
+    master_addr: str = "127.0.0.1",
+    master_port: int = 29500,
+    baseline: float | None = None,
+) -> int:
+    """
+    Launch the training ranks of this node, each in a new process, and wait for
+    them. The same command must be run on every node with its own node_rank. CPU
+    cores are split evenly between the ranks of a node.
+
+    Args:
+        model (str): the model path.
+        train_args (dict[str, Any]): arguments for `YOLO.train`.
+        nnodes (int, optional): number of nodes. Defaults to 1.
+        nproc_per_node (int, optional): number of ranks per node. Defaults to 1.
+        node_rank (int, optional): rank of this node. Defaults to 0.
+        master_addr (str, optional): address of node 0. Defaults to "127.0.0.1".
+        master_port (int, optional): rendezvous port on node 0. Defaults to 29500.
+        baseline (float | None, optional): single-process throughput (images/s) to
+            compute scaling efficiency against. Defaults to None.
+
+    Returns:
+        int: the exit code of the first rank which failed, or 0.
+    """
+    world_size = nnodes * nproc_per_node
+    threads = max((os.cpu_count() or 1) // nproc_per_node, 1)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump({"model": model, "baseline": baseline, "train_args": train_args}, f)
+        config_file = f.name
+
+    processes = []
+    for local_rank in range(nproc_per_node):
+        env = {
+            **os.environ,
+            "RANK": str(node_rank * nproc_per_node + local_rank),
+            "LOCAL_RANK": str(local_rank),
+            "WORLD_SIZE": str(world_size),
+            "LOCAL_WORLD_SIZE": str(nproc_per_node),
+            "MASTER_ADDR": master_addr,
+            "MASTER_PORT": str(master_port),
+            "OMP_NUM_THREADS": os.environ.get("OMP_NUM_THREADS", str(threads)),
+        }
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "-m", "orion.yolo.distributed", config_file], env=env
+            )
+        )
+
+    code = 0
+    try:
+        while processes:
+            for process in list(processes):
+                returncode = process.poll()
+                if returncode is None:
+                    continue
+                processes.remove(process)
+                if returncode != 0 and code == 0:
+                    code = returncode
+                    LOGGER.error(f"A rank failed with exit code {returncode}.")
+                    for other in processes:
+                        other.terminate()
+            time.sleep(1)
+    finally:
+        for process in processes:
+            process.kill()
+        Path(config_file).unlink(missing_ok=True)
+    return code
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with open(sys.argv[1]) as f:
+        train_rank(json.load(f))
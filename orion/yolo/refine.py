@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+import torch
+import torchvision
+from ultralytics import (
+    YOLO,  # pyright: ignore[reportPrivateImportUsage]
+)
+from ultralytics.engine.results import Results
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.utils.metrics import box_iou
+
+
+def track_regions(
+    tracker: BYTETracker, shape: tuple[int, int], margin: float = 0.5
+) -> np.ndarray:
+    """
+    Compute the regions around the tracker's active tracks, in pixels. Each track's
+    box is expanded by margin times its width and height on every side.
+
+    Args:
+        tracker (BYTETracker): the tracker.
+        shape (tuple[int, int]): the frame's shape (height, width).
+        margin (float, optional): margin around each track. Defaults to 0.5.
+
+    Returns:
+        np.ndarray: the regions [x1, y1, x2, y2] (one per active track).
+    """
+    boxes = np.array(
+        [track.xyxy for track in tracker.tracked_stracks if track.is_activated]
+    ).reshape(-1, 4)
+    sizes = np.tile(boxes[:, 2:] - boxes[:, :2], 2) * margin
+    regions = boxes + sizes * np.array([-1, -1, 1, 1])
+    regions = np.clip(regions, 0, np.tile(shape[::-1], 2)).astype(int)
+    valid = (regions[:, 2] > regions[:, 0]) & (regions[:, 3] > regions[:, 1])
+    return regions[valid]
+
+
+def refine_detections(
+    model: YOLO,
+    frames: list[np.ndarray],
+    results: list[Results],
+    trackers: list[BYTETracker],
+    conf: float = 0.5,
+    margin: float = 0.5,
+    max_imgsz: int = 640,
+    iou: float = 0.3,
+    nms_iou: float = 0.7,
+) -> list[Results]:
+    """
+    Refine the detections of each frame around its tracker's active tracks. The
+    regions around the tracks are cropped at native resolution and batched through
+    the model, and each region's best detection replaces the overlapping
+    full-frame detections. The regions of nearby tracks overlap, so the refined
+    detections are deduplicated with NMS first. Compute scales with the number of
+    tracks rather than with the frames' area.
+
+    Args:
+        model (YOLO): the model.
+        frames (list[np.ndarray]): the frames.
+        results (list[Results]): the full-frame detections for each frame.
+        trackers (list[BYTETracker]): the tracker of each frame's stream.
+        conf (float, optional): confidence threshold for refined detections.
+            Defaults to 0.5.
+        margin (float, optional): margin around each track. Defaults to 0.5.
+        max_imgsz (int, optional): maximum image size for the crops.
+            Defaults to 640.
+        iou (float, optional): IoU above which a full-frame detection is replaced
+            by a refined detection. Defaults to 0.3.
+        nms_iou (float, optional): IoU above which two refined detections are
+            duplicates of the same object. Defaults to 0.7.
+
+    Returns:
+        list[Results]: the refined detections for each frame.
+    """
+    crops, origins = [], []
+    for i, (frame, tracker) in enumerate(zip(frames, trackers)):
+        for x1, y1, x2, y2 in track_regions(tracker, frame.shape[:2], margin):
+            crops.append(frame[y1:y2, x1:x2])
+            origins.append((i, x1, y1))
+    if not crops:
+        return results
+
+    # run crops at (up to) native resolution, rounded up to the model's stride
+    largest = max(max(crop.shape[:2]) for crop in crops)
+    imgsz = min(max_imgsz, 32 * math.ceil(largest / 32))
+    refined: list[list[torch.Tensor]] = [[] for _ in frames]
+    for (i, x, y), crop_result in zip(
+        origins, model.predict(crops, conf=conf, imgsz=imgsz, verbose=False)
+    ):
+        boxes = crop_result.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+        data = torch.as_tensor(boxes.data)
+        best = data[data[:, 4].argmax()].clone()
+        best[:4] += torch.tensor([x, y, x, y], dtype=best.dtype, device=best.device)
+        refined[i].append(best)
+
+    merged = []
+    for result, detections in zip(results, refined):
+        if not detections or result.boxes is None:
+            merged.append(result)
+            continue
+        data = torch.as_tensor(result.boxes.data)
+        new = torch.stack(detections).to(data.device)
+        # a vehicle in the regions of several tracks is detected once per region
+        new = new[torchvision.ops.nms(new[:, :4], new[:, 4], nms_iou)]
+        if len(data):
+            overlaps = box_iou(data[:, :4], new[:, :4]).max(dim=1).values
+            data = data[overlaps < iou]
+        refined_result = result.new()
+        refined_result.update(boxes=torch.cat([new, data]))
+        merged.append(refined_result)
+    return merged
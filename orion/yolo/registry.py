@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from copy import deepcopy
+from functools import lru_cache
+from pathlib import Path
+
+import torch
+from ultralytics import (
+    YOLO,  # pyright: ignore[reportPrivateImportUsage]
+)
+
+from orion.artifacts import register_artifact
+from orion.config.settings import settings
+from orion.utils import download_file
+
+LOGGER = logging.getLogger(__name__)
+
+MODELS_URL = "https://github.com/jonasrenault/orion/releases/download/v2.0.0"
+MODEL_NAMES = ("orion12n", "orion12s", "orion12m", "orion12l")
+
+# maximum number of models kept in memory by `load_model`
+CACHE_SIZE = 4
+_MODELS: OrderedDict[tuple[str, str, str | None], YOLO] = OrderedDict()
+
+
+def models_dir() -> Path:
+    """
+    Return the directory where orion's model weights are cached.
+
+    Returns:
+        Path: ORION_HOME_DIR / "models"
+    """
+    return settings.ORION_HOME_DIR / "models"
+
+
+def resolve_model(model: str | Path) -> str | Path:
+    """
+    Resolve a model name or path. Orion model names (orion12n/s/m/l) are resolved
+    to weights cached in ORION_HOME_DIR / "models", which are downloaded on first
+    use and checked to load. Other models are returned as is (ultralytics will
+    resolve them).
+
+    Args:
+        model (str | Path): a model name or path.
+
+    Returns:
+        str | Path: the model path.
+    """
+    name = Path(model).stem
+    if Path(model).is_file() or name not in MODEL_NAMES:
+        return model
+
+    dir = models_dir()
+    dir.mkdir(parents=True, exist_ok=True)
+    weights = dir / f"{name}.pt"
+    checksum = weights.with_suffix(".sha256")
+    if weights.is_file() and checksum.is_file():
+        return weights
+
+    # download to a temporary file so that an interrupted download is never used
+    tmp = dir / f"{name}.download.pt"
+    download_file(f"{MODELS_URL}/{name}.pt", tmp, force=True)
+    try:
+        YOLO(tmp)
+    except Exception as e:
+        tmp.unlink(missing_ok=True)
+        raise RuntimeError(
+            f"Invalid weights downloaded for {name}. Please retry download."
+        ) from e
+    tmp.replace(weights)
+    # record the digest of the downloaded weights, which also marks a complete download
+    checksum.write_text(weights_hash(weights))
+    register_artifact(weights, producer="registry")
+    LOGGER.info(f"Downloaded {name} weights to [bold green]{weights}[/].")
+    return weights
+
+
+def weights_hash(path: Path) -> str:
+    """
+    Return the sha256 of a weights file's content. Hashes are memoized for as long
+    as the file's size and modification time do not change.
+
+    Args:
+        path (Path): the weights file.
+
+    Returns:
+        str: the hex digest of the file's content.
+    """
+    stat = path.stat()
+    return _weights_hash(path.resolve(), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=64)
+def _weights_hash(path: Path, size: int, mtime: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def model_digest(model: YOLO) -> str | None:
+    """
+    Return the hash of a model's original weights. Models loaded with `load_model`
+    carry the digest of the weights they were loaded from, which does not change
+    when a fused or exported variant is loaded instead.
+
+    Args:
+        model (YOLO): the model.
+
+    Returns:
+        str | None: the weights hash, or None if the model has no weights file.
+    """
+    digest = getattr(model, "weights_digest", None)
+    if digest is None and model.ckpt_path and Path(model.ckpt_path).is_file():
+        digest = weights_hash(Path(model.ckpt_path))
+    return digest
+
+
+def _save_fused(model: YOLO, path: Path):
+    """
+    Save a fused model in fp32 (`YOLO.save` stores fp16 weights), writing to a
+    temporary file first so that concurrent processes never load a partial file.
+    """
+    assert isinstance(model.model, torch.nn.Module)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.pt")
+    torch.save({**model.ckpt, "ema": None, "model": deepcopy(model.model).float()}, tmp)
+    os.replace(tmp, path)
+
+
+def _load_variant(weights: Path, digest: str, format: str | None, imgsz: int) -> YOLO:
+    """
+    Load a fused or exported variant of a model, creating and persisting it in
+    ORION_HOME_DIR / "models" the first time.
+
+    Args:
+        weights (Path): the model weights.
+        digest (str): the weights hash.
+        format (str | None): export format, or None for fused pytorch weights.
+        imgsz (int): image size for exported models.
+
+    Returns:
+        YOLO: the model.
+    """
+    variants_dir = models_dir() / "variants"
+    variants_dir.mkdir(parents=True, exist_ok=True)
+
+    if format is None:
+        fused = variants_dir / f"{digest}.fused.pt"
+        if fused.is_file():
+            return YOLO(fused)
+        model = YOLO(weights)
+        model.fuse()
+        _save_fused(model, fused)
+        register_artifact(fused, producer="registry", hash=False)
+        LOGGER.info(f"Saved fused model to {fused}.")
+        return model
+
+    prefix = f"{digest}_{imgsz}_{format}_"
+    exported = next(variants_dir.glob(f"{prefix}*"), None)
+    if exported is None:
+        exported = Path(YOLO(weights).export(format=format, imgsz=imgsz))
+        exported = exported.rename(variants_dir / f"{prefix}{exported.name}")
+        register_artifact(exported, producer="registry", hash=False)
+        LOGGER.info(f"Saved {format} model to {exported}.")
+    return YOLO(exported, task="detect")
+
+
+def load_model(
+    model: str | Path, device: str = "", format: str | None = None, imgsz: int = 640
+) -> YOLO:
+    """
+    Load a model for inference. Models are fused (or exported to the given format)
+    once and persisted in ORION_HOME_DIR / "models", and the loaded models are kept
+    in an in-process LRU cache keyed by the weights' content hash and the device.
+    The hash of the original weights is set on the model's `weights_digest`
+    attribute (see `model_digest`).
+
+    Args:
+        model (str | Path): a model name (orion12n/s/m/l) or path.
+        device (str, optional): device to use. Defaults to ''.
+        format (str | None, optional): export format (e.g. "onnx", "openvino").
+            Defaults to None (fused pytorch model).
+        imgsz (int, optional): image size for exported models. Defaults to 640.
+
+    Returns:
+        YOLO: the model.
+    """
+    weights = resolve_model(model)
+    if not Path(weights).is_file():
+        # let ultralytics resolve and download other models
+        yolo = YOLO(weights)
+        yolo.weights_digest = model_digest(yolo)  # type: ignore
+        return yolo
+
+    digest = weights_hash(Path(weights))
+    key = (digest, device, None if format is None else f"{format}-{imgsz}")
+    if key in _MODELS:
+        _MODELS.move_to_end(key)
+        return _MODELS[key]
+
+    yolo = _load_variant(Path(weights), digest, format, imgsz)
+    yolo.weights_digest = digest  # type: ignore
+    if format is None:
+        if device:
+            yolo.to(device)
+        yolo.model.eval()  # type: ignore
+
+    _MODELS[key] = yolo
+    if len(_MODELS) > CACHE_SIZE:
+        _MODELS.popitem(last=False)
+    return yolo
@@ -0,0 +1,172 @@
+import logging
+import sqlite3
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from ultralytics.engine.results import Results
+
+LOGGER = logging.getLogger(__name__)
+
+PREDICTIONS_FILE = "predictions.sqlite"
+
+
+def _key(path: str | Path) -> str:
+    return str(Path(path).resolve())
+
+
+class PredictionStore:
+    """
+    A single-file store of detection results, indexed by image path, which replaces
+    one YOLO txt file per image. The store is a SQLite database in WAL mode, so that
+    several processes can write predictions concurrently. Detections are stored in
+    YOLO format [cls, x, y, w, h, conf] with normalized, centered coordinates.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Open (or create) a prediction store.
+
+        Args:
+            path (Path): the store's database file.
+        """
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS predictions (
+                path TEXT NOT NULL,
+                frame INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (path, frame)
+            );
+            """)
+
+    def put(
+        self,
+        path: str | Path,
+        shape: tuple[int, int],
+        detections: npt.NDArray[np.floating],
+        frame: int = 0,
+    ):
+        """
+        Save the detections of an image (or video frame).
+
+        Args:
+            path (str | Path): the image or video path.
+            shape (tuple[int, int]): the image shape (height, width).
+            detections (npt.NDArray[np.floating]): the detections
+                [cls, x, y, w, h, conf].
+            frame (int, optional): the video frame, or 0 for images. Defaults to 0.
+        """
+        self.put_many([(path, frame, shape, detections)])
+
+    def put_many(
+        self,
+        rows: Iterable[tuple[str | Path, int, tuple[int, int], npt.NDArray[np.floating]]],
+    ):
+        """
+        Save the detections of several images in a single transaction.
+
+        Args:
+            rows (Iterable[tuple[str | Path, int, tuple[int, int], NDArray]]): the
+                path, frame, shape (height, width) and detections of each image.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        _key(path),
+                        frame,
+                        shape[0],
+                        shape[1],
+                        np.asarray(detections, dtype=np.float32).tobytes(),
+                    )
+                    for path, frame, shape, detections in rows
+                ),
+            )
+
+    def put_results(self, results: Iterable[Results], video: bool = False):
+        """
+        Save detection results.
+
+        Args:
+            results (Iterable[Results]): the detection results.
+            video (bool, optional): results are the consecutive frames of a video,
+                numbered from 1. Defaults to False.
+        """
+        rows = []
+        for frame, result in enumerate(results, start=1):
+            boxes = result.boxes
+            assert boxes is not None
+            detections = np.column_stack(
+                [
+                    boxes.cls.cpu().numpy(),  # type: ignore
+                    boxes.xywhn.cpu().numpy(),  # type: ignore
+                    boxes.conf.cpu().numpy(),  # type: ignore
+                ]
+            ).reshape(-1, 6)
+            rows.append(
+                (result.path, frame if video else 0, result.orig_shape, detections)
+            )
+        self.put_many(rows)
+
+    def get(self, path: str | Path, frame: int = 0) -> npt.NDArray[np.floating]:
+        """
+        Get the detections of an image (or video frame).
+
+        Args:
+            path (str | Path): the image or video path.
+            frame (int, optional): the video frame, or 0 for images. Defaults to 0.
+
+        Returns:
+            npt.NDArray[np.floating]: the detections [cls, x, y, w, h, conf], or an
+                empty array if the image is not in the store.
+        """
+        row = self.conn.execute(
+            "SELECT data FROM predictions WHERE path = ? AND frame = ?",
+            (_key(path), frame),
+        ).fetchone()
+        if row is None:
+            return np.array([])
+        return np.frombuffer(row[0], dtype=np.float32).reshape(-1, 6).astype(np.float64)
+
+    def __len__(self) -> int:
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()
+        return count
+
+    def export_txt(self, labels_dir: Path, save_conf: bool = True) -> int:
+        """
+        Export the predictions to one YOLO txt file per image, named like the
+        label files saved by ultralytics.
+
+        Args:
+            labels_dir (Path): the directory to save label files to.
+            save_conf (bool, optional): save confidence score for each detection.
+                Defaults to True.
+
+        Returns:
+            int: the number of label files written.
+        """
+        labels_dir.mkdir(parents=True, exist_ok=True)
+        count = 0
+        for path, frame, data in self.conn.execute(
+            "SELECT path, frame, data FROM predictions"
+        ):
+            detections = np.frombuffer(data, dtype=np.float32).reshape(-1, 6)
+            if not len(detections):
+                continue
+            stem = Path(path).stem + (f"_{frame}" if frame else "")
+            np.savetxt(
+                labels_dir / f"{stem}.txt",
+                detections if save_conf else detections[:, :5],
+                fmt=["%d"] + ["%g"] * (5 if save_conf else 4),
+            )
+            count += 1
+        LOGGER.info(f"Exported {count} label files to [bold green]{labels_dir}[/].")
+        return count
@@ -0,0 +1,237 @@
+import logging
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from ultralytics import (
+    YOLO,  # pyright: ignore[reportPrivateImportUsage]
+)
+from ultralytics.engine.results import Results
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import YAML, IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+from orion.yolo.refine import refine_detections
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class Stream:
+    """
+    State of a single video stream processed by `track_streams`.
+    """
+
+    source: Path
+    capture: cv2.VideoCapture
+    tracker: BYTETracker
+    writer: cv2.VideoWriter | None = None
+    frames: int = 0
+
+
+def load_tracker(tracker: str) -> BYTETracker:
+    """
+    Create a new BoT-SORT or ByteTrack tracker from a tracker configuration file.
+
+    Args:
+        tracker (str): the tracker configuration file (e.g. "botsort.yaml").
+
+    Returns:
+        BYTETracker: the tracker instance.
+    """
+    cfg = IterableSimpleNamespace(**YAML.load(check_yaml(tracker)))
+    if cfg.tracker_type not in ("botsort", "bytetrack"):
+        raise ValueError(
+            f"Unsupported tracker type {cfg.tracker_type}. "
+            "Only 'botsort' and 'bytetrack' are supported."
+        )
+    return TRACKER_MAP[cfg.tracker_type](args=cfg)
+
+
+def update_tracker(tracker: BYTETracker, result: Results) -> Results:
+    """
+    Update a tracker with the detections of a single frame, and return the frame's
+    results restricted to tracked boxes (with their track ids).
+
+    Args:
+        tracker (BYTETracker): the stream's tracker.
+        result (Results): detection results for the current frame.
+
+    Returns:
+        Results: the tracked results.
+    """
+    boxes = result.boxes
+    assert boxes is not None
+    tracks = tracker.update(boxes.cpu().numpy(), result.orig_img)
+    if len(tracks) == 0:
+        return result[:0]
+
+    idx = tracks[:, -1].astype(int)
+    tracked = result[idx]
+    tracked.update(boxes=torch.as_tensor(tracks[:, :-1], device=boxes.data.device))
+    return tracked
+
+
+def open_stream(
+    source: Path, tracker: str, save_dir: Path | None = None, name: str | None = None
+) -> Stream:
+    """
+    Open a video stream with its own tracker, and a video writer if save_dir is set.
+
+    Args:
+        source (Path): the input video.
+        tracker (str): the tracker configuration file.
+        save_dir (Path | None, optional): directory to save the annotated video to.
+            Defaults to None.
+        name (str | None, optional): the annotated video's file name, without
+            extension. Defaults to the source's stem.
+
+    Returns:
+        Stream: the stream.
+    """
+    capture = cv2.VideoCapture(str(source))
+    if not capture.isOpened():
+        raise RuntimeError(f"Unable to open video {source}.")
+
+    writer = None
+    if save_dir is not None:
+        save_dir.mkdir(parents=True, exist_ok=True)
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        writer = cv2.VideoWriter(
+            str(save_dir / f"{name or source.stem}.mp4"),
+            cv2.VideoWriter_fourcc(*"mp4v"),  # type: ignore
+            fps,
+            (width, height),
+        )
+    return Stream(source, capture, load_tracker(tracker), writer)
+
+
+def close_stream(stream: Stream):
+    """
+    Release a stream's video capture and writer.
+
+    Args:
+        stream (Stream): the stream.
+    """
+    stream.capture.release()
+    if stream.writer is not None:
+        stream.writer.release()
+
+
+def track_streams(
+    model: YOLO,
+    sources: list[Path],
+    conf: float = 0.5,
+    tracker: str = "botsort.yaml",
+    imgsz: int = 640,
+    save_dir: Path | None = None,
+    refine: bool = False,
+) -> Iterator[tuple[Stream, Results]]:
+    """
+    Track objects in several videos at once. Each video keeps its own tracker, but
+    the current frame of every active video is grouped into a single batch for
+    the model's forward pass, and the detections are then dispatched back to each
+    video's tracker.
+
+    Args:
+        model (YOLO): the model shared by all streams.
+        sources (list[Path]): the input videos.
+        conf (float, optional): confidence threshold for detections. Defaults to 0.5.
+        tracker (str, optional): the tracker configuration file.
+            Defaults to "botsort.yaml".
+        imgsz (int, optional): image size. Defaults to 640.
+        save_dir (Path | None, optional): directory to save annotated videos to.
+            Defaults to None.
+        refine (bool, optional): refine detections around active tracks at native
+            resolution (see `refine_detections`). Defaults to False.
+
+    Yields:
+        tuple[Stream, Results]: the stream and its tracked results, for each frame.
+    """
+    # videos with the same file name (in different directories) are saved under
+    # their index, so that their writers do not overwrite each other
+    stems = [source.stem for source in sources]
+    names = [
+        stem if stems.count(stem) == 1 else f"{stem}_{index}"
+        for index, stem in enumerate(stems)
+    ]
+    streams = [
+        open_stream(source, tracker, save_dir, name)
+        for source, name in zip(sources, names)
+    ]
+    try:
+        active = list(streams)
+        while active:
+            frames: list[np.ndarray] = []
+            for stream in list(active):
+                ok, frame = stream.capture.read()
+                if ok:
+                    frames.append(frame)
+                else:
+                    active.remove(stream)
+            if not frames:
+                break
+
+            results = model.predict(frames, conf=conf, imgsz=imgsz, verbose=False)
+            if refine:
+                trackers = [stream.tracker for stream in active]
+                results = refine_detections(model, frames, results, trackers, conf)
+            for stream, result in zip(active, results):
+                tracked = update_tracker(stream.tracker, result)
+                stream.frames += 1
+                if stream.writer is not None:
+                    stream.writer.write(tracked.plot())
+                yield stream, tracked
+    finally:
+        for stream in streams:
+            close_stream(stream)
+
+
+def run_streams(
+    model: YOLO,
+    sources: list[Path],
+    conf: float = 0.5,
+    tracker: str = "botsort.yaml",
+    imgsz: int = 640,
+    save_dir: Path | None = None,
+    refine: bool = False,
+) -> dict[str, int]:
+    """
+    Run `track_streams` to completion and log the aggregate throughput.
+
+    Args:
+        model (YOLO): the model shared by all streams.
+        sources (list[Path]): the input videos.
+        conf (float, optional): confidence threshold for detections. Defaults to 0.5.
+        tracker (str, optional): the tracker configuration file.
+            Defaults to "botsort.yaml".
+        imgsz (int, optional): image size. Defaults to 640.
+        save_dir (Path | None, optional): directory to save annotated videos to.
+            Defaults to None.
+        refine (bool, optional): refine detections around active tracks at native
+            resolution (see `refine_detections`). Defaults to False.
+
+    Returns:
+        dict[str, int]: number of frames processed for each stream.
+    """
+    frames: dict[str, int] = {str(source): 0 for source in sources}
+    start = time.perf_counter()
+    for stream, _ in track_streams(
+        model, sources, conf, tracker, imgsz, save_dir, refine
+    ):
+        frames[str(stream.source)] = stream.frames
+    elapsed = time.perf_counter() - start
+
+    total = sum(frames.values())
+    LOGGER.info(
+        f"Tracked {total} frames from {len(sources)} streams in {elapsed:.1f}s "
+        f"({total / max(elapsed, 1e-9):.1f} frames/s)."
+    )
+    return frames
@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any
+
+import torch
+from ultralytics import (
+    YOLO,  # pyright: ignore[reportPrivateImportUsage]
+)
+
+from orion.config.settings import settings
+from orion.yolo.registry import model_digest
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CPUConfig:
+    """
+    A CPU execution configuration for inference.
+    """
+
+    threads: int
+    interop_threads: int = 1
+    batch: int = 1
+    precision: str = "fp32"
+    channels_last: bool = False
+
+    def __str__(self) -> str:
+        return (
+            f"threads={self.threads}, interop={self.interop_threads}, "
+            f"batch={self.batch}, {self.precision}, "
+            f"{'channels_last' if self.channels_last else 'contiguous'}"
+        )
+
+
+def profile_file() -> Path:
+    """
+    Return the CPU profile file of the local host.
+
+    Returns:
+        Path: ORION_HOME_DIR / "profiles" / "<hostname>.json"
+    """
+    return settings.ORION_HOME_DIR / "profiles" / f"{socket.gethostname()}.json"
+
+
+def _to_float(output: Any) -> Any:
+    if isinstance(output, torch.Tensor):
+        return output.float()
+    if isinstance(output, (list, tuple)):
+        return type(output)(_to_float(o) for o in output)
+    if isinstance(output, dict):
+        return {k: _to_float(v) for k, v in output.items()}
+    return output
+
+
+def configure_model(net: torch.nn.Module, config: CPUConfig):
+    """
+    Apply a config's memory layout and precision to a pytorch model. In bf16, the
+    forward pass runs under CPU autocast and its outputs are cast back to fp32.
+
+    Args:
+        net (torch.nn.Module): the model.
+        config (CPUConfig): the config.
+    """
+    if config.channels_last:
+        net.to(memory_format=torch.channels_last)  # type: ignore
+    forward = net.forward
+
+    def configured_forward(x, *args, **kwargs):
+        if config.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        with torch.autocast("cpu", torch.bfloat16, enabled=config.precision == "bf16"):
+            output = forward(x, *args, **kwargs)
+        return _to_float(output)
+
+    net.forward = configured_forward  # type: ignore
+
+
+def configure_threads(config: CPUConfig):
+    """
+    Set pytorch's intra-op and inter-op thread counts. The inter-op thread count
+    can only be set once per process, before any parallel work.
+
+    Args:
+        config (CPUConfig): the config.
+    """
+    torch.set_num_threads(config.threads)
+    try:
+        torch.set_num_interop_threads(config.interop_threads)
+    except RuntimeError:
+        LOGGER.debug("Inter-op threads already set. Skipping.")
+
+
+def _measure(
+    model: str, config: CPUConfig, imgsz: int, iterations: int
+) -> tuple[float, float]:
+    """
+    Measure the latency and throughput of a model for a config, on synthetic
+    inputs. Meant to run in a fresh process, so that thread settings apply.
+
+    Returns:
+        tuple[float, float]: the latency per batch (ms) and throughput (images/s).
+    """
+    configure_threads(config)
+    net = YOLO(model).model
+    assert isinstance(net, torch.nn.Module)
+    net = net.fuse(verbose=False).eval().float()  # type: ignore
+    configure_model(net, config)
+
+    x = torch.rand(config.batch, 3, imgsz, imgsz)
+    with torch.inference_mode():
+        for _ in range(2):
+            net(x)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            net(x)
+        elapsed = time.perf_counter() - start
+    return elapsed * 1000 / iterations, config.batch * iterations / elapsed
+
+
+def measure(
+    model: str, config: CPUConfig, imgsz: int = 640, iterations: int = 10
+) -> tuple[float, float] | None:
+    """
+    Measure the latency and throughput of a model for a config in a new process.
+
+    Args:
+        model (str): the model path.
+        config (CPUConfig): the config.
+        imgsz (int, optional): image size. Defaults to 640.
+        iterations (int, optional): number of timed forward passes. Defaults to 10.
+
+    Returns:
+        tuple[float, float] | None: the latency per batch (ms) and throughput
+            (images/s), or None if the config failed.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        try:
+            return pool.submit(_measure, model, config, imgsz, iterations).result()
+        except Exception as e:
+            LOGGER.warning(f"Config {config} failed: {e}")
+            return None
+
+
+def sweep(
+    model: str, imgsz: int = 640, iterations: int = 10
+) -> list[tuple[CPUConfig, float, float]]:
+    """
+    Search for the CPU config with the highest throughput. Each setting (threads,
+    inter-op threads, batch size, precision, memory layout) is tuned in turn,
+    keeping the best value of the previous settings.
+
+    Args:
+        model (str): the model path.
+        imgsz (int, optional): image size. Defaults to 640.
+        iterations (int, optional): number of timed forward passes per config.
+            Defaults to 10.
+
+    Returns:
+        list[tuple[CPUConfig, float, float]]: every config tried, with its latency
+            per batch (ms) and throughput (images/s).
+    """
+    cores = os.cpu_count() or 1
+    candidates: dict[str, list[Any]] = {
+        "threads": sorted({max(cores // d, 1) for d in (1, 2, 4)}, reverse=True),
+        "interop_threads": [1, 2],
+        "batch": [1, 4, 8],
+        "precision": ["fp32", "bf16"],
+        "channels_last": [False, True],
+    }
+
+    best = CPUConfig(threads=cores)
+    measured: dict[CPUConfig, tuple[float, float] | None] = {}
+    for field, values in candidates.items():
+        for value in values:
+            config = replace(best, **{field: value})
+            if config not in measured:
+                measured[config] = measure(model, config, imgsz, iterations)
+                if measured[config] is not None:
+                    latency, throughput = measured[config]  # type: ignore
+                    LOGGER.info(
+                        f"{config}: {latency:.1f} ms/batch, {throughput:.1f} images/s"
+                    )
+        best = max(
+            (c for c, m in measured.items() if m is not None),
+            key=lambda c: measured[c][1],  # type: ignore
+            default=best,
+        )
+    return [(c, *m) for c, m in measured.items() if m is not None]
+
+
+def _profile_key(digest: str, imgsz: int) -> str:
+    return f"{digest}:{imgsz}"
+
+
+def save_profile(digest: str, imgsz: int, config: CPUConfig, throughput: float):
+    """
+    Save the best config for a model and image size to the host's profile.
+
+    Args:
+        digest (str): the hash of the model's original weights (see
+            `model_digest`).
+        imgsz (int): image size.
+        config (CPUConfig): the best config.
+        throughput (float): its throughput (images/s).
+    """
+    path = profile_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiles = json.loads(path.read_text()) if path.is_file() else {}
+    entry = {**asdict(config), "throughput": throughput}
+    profiles[_profile_key(digest, imgsz)] = entry
+    path.write_text(json.dumps(profiles, indent=2))
+
+
+def load_profile(model: YOLO, imgsz: int = 640) -> CPUConfig | None:
+    """
+    Load the host's CPU config for a model and image size. Configs are keyed by the
+    hash of the model's original weights, so that a config tuned for one model is
+    never applied to another.
+
+    Args:
+        model (YOLO): the model.
+        imgsz (int, optional): image size. Defaults to 640.
+
+    Returns:
+        CPUConfig | None: the config, or None if the model was never tuned for
+            this image size on this host.
+    """
+    path = profile_file()
+    digest = model_digest(model)
+    if not path.is_file() or digest is None:
+        return None
+    entry = json.loads(path.read_text()).get(_profile_key(digest, imgsz))
+    if entry is None:
+        return None
+    entry.pop("throughput", None)
+    return CPUConfig(**entry)
+
+
+def apply_profile(model: YOLO, device: str = "", imgsz: int = 640) -> dict[str, Any]:
+    """
+    Apply the host's CPU profile (if any) to a model running on CPU.
+
+    Args:
+        model (YOLO): the model.
+        device (str, optional): the device. Defaults to ''.
+        imgsz (int, optional): image size. Defaults to 640.
+
+    Returns:
+        dict[str, Any]: extra prediction arguments (batch size).
+    """
+    on_cpu = device == "cpu" or (not device and not torch.cuda.is_available())
+    if not on_cpu or getattr(model, "_cpu_config", None) is not None:
+        return {"batch": model._cpu_config.batch} if on_cpu else {}  # type: ignore
+
+    config = load_profile(model, imgsz)
+    if config is None:
+        return {}
+    LOGGER.info(f"Using CPU profile {config}.")
+    configure_threads(config)
+    # exported models only use the profile's thread counts and batch size
+    if isinstance(model.model, torch.nn.Module):
+        configure_model(model.model, config)
+    model._cpu_config = config  # type: ignore
+    return {"batch": config.batch}
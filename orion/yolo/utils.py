@@ -7,6 +7,8 @@ import numpy as np
 import numpy.typing as npt
 from fiftyone.types.dataset_types import YOLOv5Dataset
 
+from orion.yolo.store import PREDICTIONS_FILE, PredictionStore
+
 
 def export_yolo_data(
     samples: fo.DatasetView | fo.Dataset,
@@ -162,22 +164,33 @@ def add_yolo_detections(
     class_list: list[str],
 ):
     """
-    Add detections predicted with a yolo model to a Fiftyone View
+    Add detections predicted with a yolo model to a Fiftyone View. Detections are
+    read from the prediction store (predictions.sqlite) if predictions_dir is a
+    store or contains one, and from the txt label files in predictions_dir
+    otherwise.
 
     Args:
         test_view (fo.Dataset | fo.DatasetView): the test view
         prediction_field (str): the prediction field to store detections in the test view
-        predictions_dir (Path): the predictions directory
+        predictions_dir (Path): the prediction store, or the predictions directory
         class_list (list[str]): the class list
     """
-    test_filepaths = test_view.values("filepath")
-    predictions_files = [
-        predictions_dir / Path(fp).with_suffix(".txt").name for fp in test_filepaths  # type: ignore
-    ]
-    yolo_detections = [
-        _read_yolo_detections_file(predictions_file)
-        for predictions_file in predictions_files
-    ]
+    test_filepaths: list[str] = test_view.values("filepath")  # type: ignore
+    store_file = (
+        predictions_dir
+        if predictions_dir.suffix == ".sqlite"
+        else predictions_dir / PREDICTIONS_FILE
+    )
+    if store_file.is_file():
+        store = PredictionStore(store_file)
+        yolo_detections = [store.get(fp) for fp in test_filepaths]
+    else:
+        yolo_detections = [
+            _read_yolo_detections_file(
+                predictions_dir / Path(fp).with_suffix(".txt").name
+            )
+            for fp in test_filepaths
+        ]
     detections = [
         _convert_yolo_detections_to_fiftyone(yd, class_list) for yd in yolo_detections
     ]
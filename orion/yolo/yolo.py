@@ -1,22 +1,50 @@
 import logging
+from dataclasses import asdict
 from pathlib import Path
 from typing import Annotated
 
 import typer
+from rich.console import Console
+from rich.table import Table
 from ultralytics import (
     YOLO,  # pyright: ignore[reportPrivateImportUsage]
 )
 from ultralytics import (
     settings as yolo_settings,
 )
+from ultralytics.data.utils import VID_FORMATS
 from ultralytics.engine.results import Results
+from ultralytics.utils.files import increment_path
 
 from orion.config.settings import settings
+from orion.yolo.cache import DetectionCache, cached_predict
+from orion.yolo.cascade import cascade_predict, cascade_track, time_baseline
+from orion.yolo.chunks import track_chunks as run_chunks
+from orion.yolo.distill import distill as run_distillation
+from orion.yolo.distill import narrow_model
+from orion.yolo.distributed import add_scaling_report, launch
+from orion.yolo.registry import load_model, model_digest, resolve_model
+from orion.yolo.store import PREDICTIONS_FILE, PredictionStore
+from orion.yolo.streams import run_streams
+from orion.yolo.tune import apply_profile, save_profile, sweep
 
 app = typer.Typer()
 LOGGER = logging.getLogger(__name__)
 
 
+def is_video(data: Path) -> bool:
+    """
+    Check if data is a video file.
+
+    Args:
+        data (Path): the data path.
+
+    Returns:
+        bool: True if data is a video file.
+    """
+    return data.suffix[1:].lower() in VID_FORMATS
+
+
 @app.command()
 def train(
     base_model: Annotated[str, typer.Argument(metavar="model", help="base model name.")],
@@ -45,12 +73,43 @@ def train(
     batch: Annotated[int, typer.Option("--batch", "-b", help="batch size.")] = 16,
     device: Annotated[str, typer.Option(help="device.")] = "",
     plots: Annotated[bool, typer.Option(help="plot metrics during training.")] = True,
+    resume: Annotated[
+        bool, typer.Option(help="resume training from the last checkpoint in output.")
+    ] = False,
+    nnodes: Annotated[
+        int, typer.Option(envvar="NNODES", help="number of nodes for CPU DDP training.")
+    ] = 1,
+    nproc_per_node: Annotated[
+        int,
+        typer.Option(
+            envvar="NPROC_PER_NODE", help="number of ranks per node for CPU DDP training."
+        ),
+    ] = 1,
+    node_rank: Annotated[
+        int, typer.Option(envvar="NODE_RANK", help="rank of this node.")
+    ] = 0,
+    master_addr: Annotated[
+        str, typer.Option(envvar="MASTER_ADDR", help="address of node 0.")
+    ] = "127.0.0.1",
+    master_port: Annotated[
+        int, typer.Option(envvar="MASTER_PORT", help="rendezvous port on node 0.")
+    ] = 29500,
+    baseline: Annotated[
+        float | None,
+        typer.Option(help="single-process throughput (images/s) for scaling efficiency."),
+    ] = None,
 ):
     """
     Fine-tune a base Yolo model on given dataset.
 
+    With more than one rank (nnodes * nproc_per_node > 1), training runs with
+    distributed data-parallel on CPUs over the gloo backend, and the command must
+    be run on every node with its own node_rank. A scaling report with the training
+    throughput is saved to the output directory.
+
     Args:
-        base_model (str | Path): base model name.
+        base_model (str | Path): base model name or path (orion model names are
+            resolved to weights cached in ORION_HOME_DIR).
         data (Path): training data.
         output (Path, optional): save directory. Defaults to Path() / runs.
         exist_ok (bool, optional): override results in save dir if exists.
@@ -60,13 +119,63 @@ def train(
         batch (int, optional): batch size. Defaults to 16.
         device (str, optional): device to use. Defaults to ''.
         plots (bool, optional): plot metrics during training. Defaults to True.
+        resume (bool, optional): resume training from the last checkpoint in
+            output. Defaults to False.
+        nnodes (int, optional): number of nodes. Defaults to 1.
+        nproc_per_node (int, optional): number of ranks per node. Defaults to 1.
+        node_rank (int, optional): rank of this node. Defaults to 0.
+        master_addr (str, optional): address of node 0. Defaults to "127.0.0.1".
+        master_port (int, optional): rendezvous port on node 0. Defaults to 29500.
+        baseline (float | None, optional): single-process throughput (images/s) to
+            compute scaling efficiency against. Defaults to None.
     """
     LOGGER.info(f"Loading model from {base_model}...")
     yolo_settings.update({"tensorboard": True})
-    model = YOLO(base_model)
+    if resume:
+        base_model = str(output / "weights" / "last.pt")
+    model_file = str(resolve_model(base_model))
     project = output.parent
     name = output.name
 
+    if nnodes * nproc_per_node > 1:
+        if device not in ("", "cpu"):
+            LOGGER.warning(f"Distributed training runs on CPU, ignoring device {device}.")
+        if not exist_ok and not resume:
+            output = increment_path(output)
+            name = output.name
+        LOGGER.info(
+            f"Running distributed training on {nnodes * nproc_per_node} CPU ranks. "
+            f"Output saved to [bold green]{output}[/]."
+        )
+        train_args = dict(
+            data=str(data),
+            epochs=epochs,
+            imgsz=imgsz,
+            batch=batch,
+            project=str(project),
+            name=name,
+            exist_ok=True,
+            plots=plots,
+            resume=model_file if resume else False,
+        )
+        code = launch(
+            model_file,
+            train_args,
+            nnodes,
+            nproc_per_node,
+            node_rank,
+            master_addr,
+            master_port,
+            baseline,
+        )
+        if code:
+            raise typer.Exit(code=code)
+        LOGGER.info(f"Training complete. Output saved to [bold green]{output}[/].")
+        return None
+
+    model = YOLO(model_file)
+    add_scaling_report(model, baseline)
+
     LOGGER.info(f"Running training. Output saved to [bold green]{output}[/].")
     results = model.train(
         data=data,
@@ -78,6 +187,7 @@ def train(
         name=name,
         exist_ok=exist_ok,
         plots=plots,
+        resume=model_file if resume else False,
     )
     LOGGER.info(f"Training complete. Output saved to [bold green]{output}[/].")
     return results
@@ -86,8 +196,8 @@ def train(
 @app.command()
 def predict(
     model_path: Annotated[
-        Path,
-        typer.Argument(help="model path.", file_okay=True, exists=True),
+        str,
+        typer.Argument(help="model name (orion12n/s/m/l) or path."),
     ],
     data: Annotated[
         Path,
@@ -102,11 +212,14 @@ def predict(
         bool, typer.Option("--save", "-s", help="save annotated images.")
     ] = False,
     save_txt: Annotated[
-        bool, typer.Option(help="save detection results in a txt file.")
-    ] = True,
+        bool, typer.Option(help="also save detection results in txt files.")
+    ] = False,
     save_conf: Annotated[
         bool, typer.Option(help="save confidence score for each detection.")
     ] = True,
+    cache: Annotated[
+        bool, typer.Option(help="reuse cached detections for unchanged images.")
+    ] = True,
     output: Annotated[
         Path,
         typer.Option(
@@ -118,13 +231,29 @@ def predict(
     """
     Run predictions on a set of images using the given model.
 
+    Detections are cached in ORION_HOME_DIR, keyed by the image's content, the
+    model's weights and the prediction settings, so that images which were already
+    processed are neither decoded nor inferred again. The cache is not used when
+    saving annotated images.
+
+    Detections are saved to a single prediction store (predictions.sqlite) in the
+    output directory, which can be exported to YOLO txt files with `orion
+    export-labels`.
+
+    On CPU, the host's profile saved by `orion tune` (if any) sets the number
+    of threads, batch size, precision and memory layout.
+
     Args:
-        model_path (str | Path): the model to use for prediction.
+        model_path (str | Path): the model name (orion12n/s/m/l) or path to use for
+            prediction.
         data (str | Path): data to make predictions on.
         save (bool, optional): save annotated images. Defaults to False.
-        save_txt (bool, optional): save detection results in a txt file. Defaults to True.
+        save_txt (bool, optional): also save detection results in txt files.
+            Defaults to False.
         save_conf (bool, optional): save confidence score for each detection.
             Defaults to True.
+        cache (bool, optional): reuse cached detections for unchanged images.
+            Defaults to True.
         output (Path, optional): Output directory.
             Defaults to Path.cwd() / "runs/predict".
 
@@ -132,11 +261,25 @@ def predict(
         list[Results]: A list of detection results.
     """
     LOGGER.info(f"Loading model from {model_path}...")
-    model = YOLO(model_path)
+    model = load_model(model_path)
+    predict_args = apply_profile(model)
     project = output.parent
     name = output.name
 
     LOGGER.info(f"Running prediction on {data}. Output saved to [bold green]{output}[/].")
+    if cache and not save and model_digest(model) and not is_video(data):
+        save_dir = increment_path(output)
+        save_dir.mkdir(parents=True, exist_ok=True)
+        results = cached_predict(model, data, DetectionCache(), **predict_args)
+        for result in results:
+            result.save_dir = str(save_dir)  # type: ignore
+        store = PredictionStore(save_dir / PREDICTIONS_FILE)
+        store.put_results(results)
+        if save_txt:
+            store.export_txt(save_dir / "labels", save_conf)
+        LOGGER.info(f"Predictions complete. Output saved to [bold green]{save_dir}[/].")
+        return results
+
     results = model.predict(
         data,
         stream=False,
@@ -145,16 +288,69 @@ def predict(
         save_conf=save_conf,
         project=project,
         name=name,
+        **predict_args,
     )
+    if results:
+        save_dir = Path(results[0].save_dir)  # type: ignore
+        PredictionStore(save_dir / PREDICTIONS_FILE).put_results(results, is_video(data))
     LOGGER.info(f"Predictions complete. Output saved to [bold green]{output}[/].")
     return results
 
 
+@app.command()
+def export_labels(
+    predictions: Annotated[
+        Path,
+        typer.Argument(
+            help="prediction store or predict output directory.",
+            file_okay=True,
+            dir_okay=True,
+            exists=True,
+        ),
+    ],
+    save_conf: Annotated[
+        bool, typer.Option(help="save confidence score for each detection.")
+    ] = True,
+    output: Annotated[
+        Path | None,
+        typer.Option(
+            "--output",
+            "-o",
+            file_okay=False,
+            dir_okay=True,
+            help="labels directory. Defaults to labels next to the store.",
+        ),
+    ] = None,
+) -> int:
+    """
+    Export the detections of a prediction store to YOLO txt files.
+
+    Args:
+        predictions (Path): the prediction store (predictions.sqlite) or the output
+            directory of a predict run.
+        save_conf (bool, optional): save confidence score for each detection.
+            Defaults to True.
+        output (Path | None, optional): labels directory. Defaults to a labels
+            directory next to the store.
+
+    Returns:
+        int: the number of label files written.
+    """
+    if predictions.is_dir():
+        predictions = predictions / PREDICTIONS_FILE
+    if not predictions.is_file():
+        LOGGER.error(f"No prediction store found at {predictions}.")
+        raise typer.Exit(code=1)
+    return PredictionStore(predictions).export_txt(
+        output or predictions.parent / "labels", save_conf
+    )
+
+
 @app.command()
 def track(
     model_path: Annotated[
-        Path,
-        typer.Argument(help="model path.", file_okay=True, exists=True),
+        str,
+        typer.Argument(help="model name (orion12n/s/m/l) or path."),
     ],
     data: Annotated[
         Path,
@@ -170,6 +366,10 @@ def track(
     tracker: Annotated[
         str, typer.Option("--tracker", "-t", help="tracker configuration file.")
     ] = "botsort.yaml",
+    refine: Annotated[
+        bool,
+        typer.Option(help="refine detections around tracks at native resolution."),
+    ] = False,
     output: Annotated[
         Path,
         typer.Option(
@@ -182,11 +382,14 @@ def track(
     Track tanks in a video using a YOLO model and specified tracker.
 
     Args:
-        model_path (str | Path): Path to the YOLO model weights file.
+        model_path (str | Path): model name (orion12n/s/m/l) or path to the YOLO
+            model weights file.
         source (str | Path): Path to the source of video to track
         conf (float, optional): Confidence threshold for detections . Defaults to 0.5.
         tracker (str | Path, optional): The tracker configuration file.
             Defaults to "botsort.yaml".
+        refine (bool, optional): refine detections around active tracks by running
+            the model on crops at native resolution. Defaults to False.
         output (Path, optional): Output directory. Defaults to Path.cwd() / "runs/track".
 
     Returns:
@@ -194,11 +397,17 @@ def track(
             detected and tracked tanks.
     """
     LOGGER.info(f"Loading model from {model_path}...")
-    model = YOLO(model_path)
+    model = load_model(model_path)
+    track_args = apply_profile(model)
     project = output.parent
     name = output.name
 
     LOGGER.info(f"Running tracking on {data}. Output saved to [bold green]{output}[/].")
+    if refine:
+        run_streams(model, [data], conf, tracker, save_dir=output, refine=True)
+        LOGGER.info(f"Tracking complete. Output saved to [bold green]{output}[/].")
+        return
+
     results = model.track(
         source=data,
         conf=conf,
@@ -208,6 +417,435 @@ def track(
         project=project,
         name=name,
         exist_ok=True,
+        **track_args,
     )
     list(results)
     LOGGER.info(f"Tracking complete. Output saved to [bold green]{output}[/].")
+
+
+@app.command()
+def track_streams(
+    model_path: Annotated[
+        str,
+        typer.Argument(help="model name (orion12n/s/m/l) or path."),
+    ],
+    data: Annotated[
+        list[Path],
+        typer.Argument(
+            help="input videos.",
+            file_okay=True,
+            exists=True,
+        ),
+    ],
+    conf: Annotated[
+        float, typer.Option("--conf", "-c", help="confidence threshold for detections.")
+    ] = 0.5,
+    tracker: Annotated[
+        str, typer.Option("--tracker", "-t", help="tracker configuration file.")
+    ] = "botsort.yaml",
+    imgsz: Annotated[int, typer.Option("--imgsz", "-i", help="image size.")] = 640,
+    refine: Annotated[
+        bool,
+        typer.Option(help="refine detections around tracks at native resolution."),
+    ] = False,
+    output: Annotated[
+        Path,
+        typer.Option(
+            "--output", "-o", file_okay=False, dir_okay=True, help="save directory."
+        ),
+    ] = Path.cwd()
+    / "runs/track",
+) -> dict[str, int]:
+    """
+    Track military vehicles in several videos at once, batching frames from all
+    videos into a single forward pass of the model.
+
+    Args:
+        model_path (str | Path): model name (orion12n/s/m/l) or path to the YOLO
+            model weights file.
+        data (list[Path]): the input videos.
+        conf (float, optional): Confidence threshold for detections . Defaults to 0.5.
+        tracker (str | Path, optional): The tracker configuration file.
+            Defaults to "botsort.yaml".
+        imgsz (int, optional): image size. Defaults to 640.
+        refine (bool, optional): refine detections around active tracks by running
+            the model on crops at native resolution. Defaults to False.
+        output (Path, optional): Output directory. Defaults to Path.cwd() / "runs/track".
+
+    Returns:
+        dict[str, int]: number of frames tracked for each video.
+    """
+    LOGGER.info(f"Loading model from {model_path}...")
+    model = load_model(model_path)
+    apply_profile(model, imgsz=imgsz)
+
+    LOGGER.info(
+        f"Running tracking on {len(data)} videos. "
+        f"Output saved to [bold green]{output}[/]."
+    )
+    frames = run_streams(model, data, conf, tracker, imgsz, output, refine)
+    LOGGER.info(f"Tracking complete. Output saved to [bold green]{output}[/].")
+    return frames
+
+
+@app.command()
+def track_chunks(
+    model_path: Annotated[
+        str,
+        typer.Argument(help="model name (orion12n/s/m/l) or path."),
+    ],
+    data: Annotated[
+        Path,
+        typer.Argument(
+            help="input video.",
+            file_okay=True,
+            exists=True,
+        ),
+    ],
+    workers: Annotated[
+        int, typer.Option("--workers", "-w", help="number of worker processes.")
+    ] = 4,
+    overlap: Annotated[
+        int, typer.Option(help="frames of overlap between chunks to stitch tracks.")
+    ] = 30,
+    conf: Annotated[
+        float, typer.Option("--conf", "-c", help="confidence threshold for detections.")
+    ] = 0.5,
+    tracker: Annotated[
+        str, typer.Option("--tracker", "-t", help="tracker configuration file.")
+    ] = "botsort.yaml",
+    imgsz: Annotated[int, typer.Option("--imgsz", "-i", help="image size.")] = 640,
+    save: Annotated[
+        bool, typer.Option("--save", "-s", help="save the annotated video.")
+    ] = False,
+    output: Annotated[
+        Path,
+        typer.Option(
+            "--output", "-o", file_okay=False, dir_okay=True, help="save directory."
+        ),
+    ] = Path.cwd()
+    / "runs/track",
+) -> Path:
+    """
+    Track military vehicles in a long video by splitting it into time chunks which
+    are tracked in parallel by several worker processes. Track ids are stitched
+    across chunk boundaries, and the tracks are saved in MOT format.
+
+    Args:
+        model_path (str): model name (orion12n/s/m/l) or path to the YOLO model
+            weights file.
+        data (Path): the input video.
+        workers (int, optional): number of worker processes. Defaults to 4.
+        overlap (int, optional): frames of overlap between chunks to stitch tracks.
+            Defaults to 30.
+        conf (float, optional): Confidence threshold for detections. Defaults to 0.5.
+        tracker (str, optional): The tracker configuration file.
+            Defaults to "botsort.yaml".
+        imgsz (int, optional): image size. Defaults to 640.
+        save (bool, optional): save the annotated video. Defaults to False.
+        output (Path, optional): Output directory. Defaults to Path.cwd() / "runs/track".
+
+    Returns:
+        Path: the MOT tracks file.
+    """
+    LOGGER.info(f"Running tracking on {data}. Output saved to [bold green]{output}[/].")
+    mot_file = run_chunks(
+        model_path, data, workers, overlap, conf, tracker, imgsz, output, save
+    )
+    LOGGER.info(f"Tracking complete. Tracks saved to [bold green]{mot_file}[/].")
+    return mot_file
+
+
+@app.command()
+def predict_cascade(
+    small_model: Annotated[
+        str,
+        typer.Argument(help="screening model name (orion12n/s/m/l) or path."),
+    ],
+    large_model: Annotated[
+        str,
+        typer.Argument(help="large model name (orion12n/s/m/l) or path."),
+    ],
+    data: Annotated[
+        Path,
+        typer.Argument(
+            help="data to make predictions on.",
+            file_okay=True,
+            dir_okay=True,
+            exists=True,
+        ),
+    ],
+    low: Annotated[
+        float, typer.Option(help="lower bound of the uncertain confidence band.")
+    ] = 0.25,
+    high: Annotated[
+        float, typer.Option(help="upper bound of the uncertain confidence band.")
+    ] = 0.6,
+    baseline: Annotated[
+        bool, typer.Option(help="also time the large model alone for comparison.")
+    ] = False,
+    save: Annotated[
+        bool, typer.Option("--save", "-s", help="save annotated images.")
+    ] = False,
+    output: Annotated[
+        Path,
+        typer.Option(
+            "--output", "-o", file_okay=False, dir_okay=True, help="save directory."
+        ),
+    ] = Path.cwd()
+    / "runs/predict",
+) -> list[Results]:
+    """
+    Run predictions with a small model on every image, and escalate the images with
+    uncertain detections to a large model. Detections are saved in a single
+    prediction store in the output directory, which can be exported to YOLO txt
+    files with `orion export-labels`.
+
+    Args:
+        small_model (str): the screening model name or path.
+        large_model (str): the large model name or path.
+        data (str | Path): data to make predictions on.
+        low (float, optional): lower bound of the uncertain confidence band.
+            Defaults to 0.25.
+        high (float, optional): upper bound of the uncertain confidence band.
+            Defaults to 0.6.
+        baseline (bool, optional): also time the large model alone for comparison.
+            Defaults to False.
+        save (bool, optional): save annotated images. Defaults to False.
+        output (Path, optional): Output directory.
+            Defaults to Path.cwd() / "runs/predict".
+
+    Returns:
+        list[Results]: A list of detection results.
+    """
+    LOGGER.info(f"Loading models from {small_model} and {large_model}...")
+    small = load_model(small_model)
+    large = load_model(large_model)
+
+    LOGGER.info(f"Running cascade prediction on {data}.")
+    results, report = cascade_predict(small, large, data, low, high)
+    if baseline:
+        report.baseline_seconds = time_baseline(large, data, low)
+    LOGGER.info(str(report))
+
+    save_dir = increment_path(output)
+    save_dir.mkdir(parents=True, exist_ok=True)
+    PredictionStore(save_dir / PREDICTIONS_FILE).put_results(results)
+    if save:
+        for result in results:
+            result.save(str(save_dir / Path(result.path).name))
+    LOGGER.info(f"Predictions complete. Output saved to [bold green]{save_dir}[/].")
+    return results
+
+
+@app.command()
+def track_cascade(
+    small_model: Annotated[
+        str,
+        typer.Argument(help="screening model name (orion12n/s/m/l) or path."),
+    ],
+    large_model: Annotated[
+        str,
+        typer.Argument(help="large model name (orion12n/s/m/l) or path."),
+    ],
+    data: Annotated[
+        Path,
+        typer.Argument(
+            help="input video.",
+            file_okay=True,
+            exists=True,
+        ),
+    ],
+    low: Annotated[
+        float, typer.Option(help="lower bound of the uncertain confidence band.")
+    ] = 0.25,
+    high: Annotated[
+        float, typer.Option(help="upper bound of the uncertain confidence band.")
+    ] = 0.6,
+    tracker: Annotated[
+        str, typer.Option("--tracker", "-t", help="tracker configuration file.")
+    ] = "botsort.yaml",
+    baseline: Annotated[
+        bool, typer.Option(help="also time the large model alone for comparison.")
+    ] = False,
+    output: Annotated[
+        Path,
+        typer.Option(
+            "--output", "-o", file_okay=False, dir_okay=True, help="save directory."
+        ),
+    ] = Path.cwd()
+    / "runs/track",
+):
+    """
+    Track military vehicles in a video with a small model, and escalate the frames
+    with uncertain detections or lost tracks to a large model.
+
+    Args:
+        small_model (str): the screening model name or path.
+        large_model (str): the large model name or path.
+        data (Path): the input video.
+        low (float, optional): lower bound of the uncertain confidence band.
+            Defaults to 0.25.
+        high (float, optional): upper bound of the uncertain confidence band.
+            Defaults to 0.6.
+        tracker (str | Path, optional): The tracker configuration file.
+            Defaults to "botsort.yaml".
+        baseline (bool, optional): also time the large model alone for comparison.
+            Defaults to False.
+        output (Path, optional): Output directory. Defaults to Path.cwd() / "runs/track".
+    """
+    LOGGER.info(f"Loading models from {small_model} and {large_model}...")
+    small = load_model(small_model)
+    large = load_model(large_model)
+
+    LOGGER.info(
+        f"Running cascade tracking on {data}. Output saved to [bold green]{output}[/]."
+    )
+    report = cascade_track(small, large, data, low, high, tracker, output)
+    if baseline:
+        report.baseline_seconds = time_baseline(large, data, low)
+    LOGGER.info(str(report))
+    LOGGER.info(f"Tracking complete. Output saved to [bold green]{output}[/].")
+    return report
+
+
+@app.command()
+def distill(
+    teacher_model: Annotated[
+        str,
+        typer.Argument(
+            metavar="teacher", help="teacher model name (orion12n/s/m/l) or path."
+        ),
+    ],
+    student_model: Annotated[
+        str,
+        typer.Argument(
+            metavar="student",
+            help="student model name (orion12n/s/m/l), path or configuration.",
+        ),
+    ],
+    data: Annotated[
+        Path,
+        typer.Option(
+            "--data",
+            "-d",
+            help="training data.",
+            file_okay=True,
+            exists=True,
+        ),
+    ] = settings.ORION_HOME_DIR
+    / "dataset"
+    / "dataset.yaml",
+    output: Annotated[
+        Path,
+        typer.Option(
+            "--output", "-o", file_okay=False, dir_okay=True, help="save directory."
+        ),
+    ] = Path.cwd()
+    / "runs/distill",
+    epochs: Annotated[int, typer.Option("--epochs", "-e", help="epochs.")] = 60,
+    imgsz: Annotated[int, typer.Option("--imgsz", "-i", help="image size.")] = 640,
+    batch: Annotated[int, typer.Option("--batch", "-b", help="batch size.")] = 16,
+    device: Annotated[str, typer.Option(help="device.")] = "",
+    conf: Annotated[
+        float,
+        typer.Option("--conf", "-c", help="confidence threshold for pseudo-labels."),
+    ] = 0.5,
+    width: Annotated[
+        float | None,
+        typer.Option(help="custom width multiple for a student configuration."),
+    ] = None,
+):
+    """
+    Train a small student model with the pseudo-labels of a larger teacher model.
+
+    Args:
+        teacher_model (str): teacher model name or path.
+        student_model (str): student model name, path or configuration
+            (e.g. yolo12n.yaml).
+        data (Path): training data.
+        output (Path, optional): save directory. Defaults to Path() / runs/distill.
+        epochs (int, optional): epochs. Defaults to 60.
+        imgsz (int, optional): image size. Defaults to 640.
+        batch (int, optional): batch size. Defaults to 16.
+        device (str, optional): device to use. Defaults to ''.
+        conf (float, optional): confidence threshold for pseudo-labels.
+            Defaults to 0.5.
+        width (float | None, optional): custom width multiple for a student
+            configuration. Defaults to None.
+
+    Returns:
+        dict[str, dict[str, float]]: mAP and inference time of teacher and student.
+    """
+    LOGGER.info(f"Loading teacher from {teacher_model}...")
+    teacher = load_model(teacher_model)
+    if width is not None:
+        student_model = str(narrow_model(student_model, width, output))
+    LOGGER.info(f"Loading student from {student_model}...")
+    student = YOLO(resolve_model(student_model))
+
+    report = run_distillation(
+        teacher, student, data, output, epochs, imgsz, batch, device, conf
+    )
+    LOGGER.info(f"Distillation complete. Output saved to [bold green]{output}[/].")
+    return report
+
+
+@app.command()
+def tune(
+    model_path: Annotated[
+        str,
+        typer.Argument(help="model name (orion12n/s/m/l) or path."),
+    ],
+    imgsz: Annotated[int, typer.Option("--imgsz", "-i", help="image size.")] = 640,
+    iterations: Annotated[
+        int, typer.Option("--iterations", "-n", help="timed forward passes per config.")
+    ] = 10,
+) -> dict[str, float | int | str | bool]:
+    """
+    Tune CPU inference settings for this host. Thread counts, batch size,
+    precision (fp32 or bf16) and memory layout are swept on synthetic inputs, each
+    configuration in a new process. The fastest configuration is saved to the
+    host's profile in ORION_HOME_DIR / "profiles", which predict and track load
+    automatically when running on CPU.
+
+    Args:
+        model_path (str): model name (orion12n/s/m/l) or path.
+        imgsz (int, optional): image size. Defaults to 640.
+        iterations (int, optional): timed forward passes per configuration.
+            Defaults to 10.
+
+    Returns:
+        dict[str, float | int | str | bool]: the best configuration and its
+            throughput.
+    """
+    model = str(resolve_model(model_path))
+    digest = model_digest(YOLO(model))
+    if digest is None:
+        LOGGER.error(f"No weights file found for {model_path}.")
+        raise typer.Exit(code=1)
+    LOGGER.info(f"Tuning CPU inference for {model}...")
+    results = sweep(model, imgsz, iterations)
+    if not results:
+        LOGGER.error("No configuration could be measured.")
+        raise typer.Exit(code=1)
+
+    table = Table(
+        "threads", "interop", "batch", "precision", "layout", "ms/batch", "images/s"
+    )
+    for config, latency, throughput in sorted(results, key=lambda r: -r[2]):
+        table.add_row(
+            str(config.threads),
+            str(config.interop_threads),
+            str(config.batch),
+            config.precision,
+            "channels_last" if config.channels_last else "contiguous",
+            f"{latency:.1f}",
+            f"{throughput:.1f}",
+        )
+    Console().print(table)
+
+    best, _, throughput = max(results, key=lambda r: r[2])
+    save_profile(digest, imgsz, best, throughput)
+    LOGGER.info(f"Best configuration: {best} ({throughput:.1f} images/s).")
+    return {**asdict(best), "throughput": throughput}
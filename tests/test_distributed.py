@@ -0,0 +1,78 @@
+import json
+import os
+import socket
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+Image = pytest.importorskip("PIL.Image")
+
+from orion.yolo.distributed import SCALING_REPORT_FILE, launch  # noqa: E402
+
+ROOT = Path(__file__).parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def dataset(tmp_path: Path) -> Path:
+    """
+    A tiny detection dataset of random images with one box each.
+    """
+    rng = np.random.default_rng(0)
+    for split in ("train", "val"):
+        images_dir = tmp_path / "images" / split
+        labels_dir = tmp_path / "labels" / split
+        images_dir.mkdir(parents=True)
+        labels_dir.mkdir(parents=True)
+        for i in range(8):
+            image = rng.integers(0, 255, (64, 64, 3), dtype=np.uint8)
+            Image.fromarray(image).save(images_dir / f"{i}.jpg")
+            (labels_dir / f"{i}.txt").write_text("0 0.5 0.5 0.4 0.4\n")
+    data = tmp_path / "data.yaml"
+    data.write_text(
+        f"path: {tmp_path}\ntrain: images/train\nval: images/val\nnames:\n  0: AFV\n"
+    )
+    return data
+
+
+@pytest.mark.skipif(
+    not torch.distributed.is_available() or not torch.distributed.is_gloo_available(),
+    reason="gloo backend is not available",
+)
+def test_launch_two_ranks(dataset: Path, tmp_path: Path, monkeypatch):
+    # the ranks run `python -m orion.yolo.distributed` in new processes
+    monkeypatch.setenv(
+        "PYTHONPATH",
+        os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])),
+    )
+    project = tmp_path / "runs"
+    code = launch(
+        "yolo11n.yaml",
+        {
+            "data": str(dataset),
+            "epochs": 1,
+            "imgsz": 64,
+            "batch": 4,
+            "workers": 0,
+            "plots": False,
+            "project": str(project),
+            "name": "ddp",
+            "exist_ok": True,
+        },
+        nproc_per_node=2,
+        master_port=_free_port(),
+    )
+
+    assert code == 0
+    with open(project / "ddp" / SCALING_REPORT_FILE) as f:
+        report = json.load(f)
+    assert report["world_size"] == 2
+    assert report["images"] == 8